@@ -1,16 +1,81 @@
+import asyncio
 import pygame
 import random
+import signal
 import sys
-from multiprocessing import Process, Pipe
+from collections import deque, namedtuple
+import multiprocessing
 import os
 import subprocess
 import time
 
+import geometry
+import protocol
+from pipe_waker import PipeWaker
+import metrics
+from render_cache import BackBuffers, FigureAtlas, SplashCache, TextCache, get_font
+from round_state import UPCOMING, RoundState
+from rounds import RoundDeck, RoundTable
+import session_log
+from sysmetrics import SystemSampler
+from thermal import ThermalGovernor, ThermalLevel
+from touch_zones import TouchZones
+
 # -------------------- Настройки расположения окон --------------------
-HDMI1_POS = "800,0"
-HDMI2_POS = "1824,0"
+# role: "controller" — тач-экран (старт, refresh, shutdown),
+#       "mirror"     — зеркало с двумя неправильными фигурами.
+# size=None — полноэкранный режим. Чтобы добавить экран — добавь строку.
+Display = namedtuple("Display", "name role pos size")
 HDMI_SIZE = (1024, 600)
+DISPLAYS = [
+    Display("DSI", "controller", "0,0", None),
+    Display("HDMI1", "mirror", "800,0", HDMI_SIZE),
+    Display("HDMI2", "mirror", "1824,0", HDMI_SIZE),
+]
 SPLASH_PATH = "/home/game/gamepi/1.png"
+
+# термо-регулятор: от порога above °C и выше — меньше fps у всех окон
+# и быстрое масштабирование вместо smoothscale. Обратно — когда CPU
+# остынет на THERMAL_HYSTERESIS ниже порога.
+THERMAL_LEVELS = [
+    ThermalLevel("normal", 0, 60, True),
+    ThermalLevel("warm", 70, 30, False),
+    ThermalLevel("hot", 80, 15, False),
+]
+THERMAL_HYSTERESIS = 5
+# корень, от которого читаются /sys и /proc (для проверки — поддельное дерево)
+SYSFS_ROOT = "/"
+# метрики всех процессов: UNIX-сокет (отдаёт текст Prometheus на каждое
+# подключение) и файл для textfile collector, обновляется раз в METRICS_INTERVAL сек.
+# None — не открывать
+METRICS_SOCKET = "/tmp/figures-metrics.sock"
+METRICS_TEXTFILE = "/tmp/figures.prom"
+METRICS_INTERVAL = 10
+# сводка задержек при выходе (ctrl+c) — по стольким последним замерам;
+# за всё время работы они есть в гистограммах метрик
+LATENCY_SAMPLES = 10000
+# управление для оператора: UNIX-сокет, команда — строка (round [N],
+# mode splash|game, state, metrics), ответ — строка. None — не открывать
+CONTROL_SOCKET = "/tmp/figures-control.sock"
+# синхронная смена раунда: main назначает публикации момент показа через
+# PRESENT_LEAD сек, и все экраны меняют раунд в первом кадре после него
+# (запас — на пробуждение окон). None — каждый экран сразу, как прочитал
+PRESENT_LEAD = 0.03
+PRESENT_SPIN = 0.002  # последние мс до present_at окно спит точным sleep
+# сторож окон: каждое окно раз в HEARTBEAT_INTERVAL сек (и на каждом кадре)
+# отмечается в своём слоте метрик. Окно, что молчит дольше HEARTBEAT_TIMEOUT
+# сек (зависло), main убивает; упавшее окно (ненулевой код выхода) main
+# сразу запускает заново — fork от себя, с текущим режимом и раундом
+HEARTBEAT_INTERVAL = 0.5
+HEARTBEAT_TIMEOUT = 3
+# seed колоды раундов; None — новый при каждом запуске (печатается в консоль,
+# с тем же seed раунды повторятся в том же порядке)
+ROUND_SEED = None
+# лог сессии (решения main и тапы DSI) для replay_session.py: файл на запуск,
+# хранятся SESSION_KEEP последних. None — не писать. Бенчмарки подставляют
+# временный каталог через FIGURES_SESSION_DIR, чтобы не вытеснять логи киоска
+SESSION_DIR = os.environ.get("FIGURES_SESSION_DIR", "/home/game/gamepi/sessions")
+SESSION_KEEP = 20
 # --------------------------------------------------------------------
 
 FIGURE_DEFS = {
@@ -23,360 +88,1144 @@ FIGURE_DEFS = {
 FIGURE_ORDER = list(FIGURE_DEFS.keys())
 NATURAL_COLORS = {f: FIGURE_DEFS[f][0] for f in FIGURE_ORDER}
 
-# ---------------- drawing funcs ----------------
-def draw_circle(screen, x, y, color):
-    pygame.draw.circle(screen, color, (x, y), 160)
-
-def draw_square(screen, x, y, color):
-    pygame.draw.rect(screen, color, (x - 160, y - 160, 320, 320))
-
-def draw_triangle(screen, x, y, color):
-    points = [(x, y-200), (x-180, y+160), (x+180, y+160)]
-    pygame.draw.polygon(screen, color, points)
-
-def draw_hexagon(screen, x, y, color):
-    r = 180
-    points = [
-        (x + r, y),
-        (x + r/2, y + int(r*0.87)),
-        (x - r/2, y + int(r*0.87)),
-        (x - r, y),
-        (x - r/2, y - int(r*0.87)),
-        (x + r/2, y - int(r*0.87))
-    ]
-    pygame.draw.polygon(screen, color, points)
-
-def draw_cross(screen, x, y, color):
-    pygame.draw.rect(screen, color, (x - 50, y - 160, 100, 320))
-    pygame.draw.rect(screen, color, (x - 160, y - 50, 320, 100))
-
-DRAW_FUNCS = {
-    "circle": draw_circle,
-    "square": draw_square,
-    "triangle": draw_triangle,
-    "hexagon": draw_hexagon,
-    "cross": draw_cross
-}
+# все допустимые раунды с готовыми правильными ответами (rounds.py)
+ROUNDS = RoundTable(FIGURE_ORDER, NATURAL_COLORS)
+# сообщения по pipe — двоичные кадры protocol.py (фигуры — индексы в этих таблицах)
+CODEC = protocol.Codec(FIGURE_ORDER, [NATURAL_COLORS[f] for f in FIGURE_ORDER])
 
-def generate_two_wrong():
-    shapes = random.sample(FIGURE_ORDER, 2)
-    result = []
-    used_colors = set()
-    for sh in shapes:
-        natural = NATURAL_COLORS[sh]
-        wrong_colors = [c for c in NATURAL_COLORS.values() if c != natural]
-        available = [c for c in wrong_colors if c not in used_colors]
-        color = random.choice(available)
-        used_colors.add(color)
-        result.append((sh, color))
-    return result
+# вспомогательная функция для выбора правильной фигуры (для DSI)
+def compute_correct(figs):
+    return ROUNDS.correct(figs)
 
-# ---------------- HDMI window (HDMI1 & HDMI2) ----------------
-def hdmi_window(conn, pos):
-    os.environ['SDL_VIDEO_WINDOW_POS'] = pos
-    pygame.init()
-    screen = pygame.display.set_mode(HDMI_SIZE, pygame.NOFRAME)
-    pygame.display.set_caption("HDMI (mirror)")
-    clock = pygame.time.Clock()
+# ---------------- общие ресурсы и цикл окна ----------------
+class Assets:
+    # заставка, атлас фигур и кэш надписей.
+    # В режиме "один процесс" — один экземпляр на все окна.
+    def __init__(self, name):
+        self.splash = SplashCache(SPLASH_PATH, name)
+        # все фигуры × цвета × размеры растеризуются один раз, кадр — только blit
+        self.atlas = FigureAtlas(geometry.SHAPES, geometry.draw)
+        self.texts = TextCache()
 
-    # загрузка заставки
-    splash_img = None
+    def warm(self):
+        # вызывается после первого кадра, чтобы заставка не ждала атлас;
+        # фигуры готовятся в тех размерах, что уже понадобились окнам
+        self.atlas.warm(NATURAL_COLORS.values())
+
+def open_display(display):
+    os.environ['SDL_VIDEO_WINDOW_POS'] = display.pos
+    # только нужные подсистемы: pygame.init() ещё открывает звук, джойстики и т.д.
+    pygame.display.init()
+    pygame.font.init()
+    if display.size is None:
+        return pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+    return pygame.display.set_mode(display.size, pygame.NOFRAME)
+
+def report_first_frame(view):
+    # main печатает время до первого кадра каждого окна, а после перезапуска
+    # сторожем — и что на этом кадре: раунд и его фигуры (без фигур — заставка)
+    figures = view.figures if view.mode == "game" else None
     try:
-        splash_img = pygame.image.load(SPLASH_PATH)
-    except Exception as e:
-        print("HDMI: не удалось загрузить заставку:", e)
+        CODEC.send(view.conn, protocol.FIRST_FRAME, round_id=view.round_id, figures=figures,
+                   t0=time.monotonic(), t1=time.clock_gettime(time.CLOCK_BOOTTIME))
+    except Exception:
+        pass
 
-    mode = "splash"  # "splash" или "game"
-    figures = generate_two_wrong()
+def drain_pipe(mailbox, slot):
+    # вычитать всё из pipe от main (WAKE/QUIT); False — пришёл QUIT
+    # или main завершился. Из скопившихся WAKE разбирается только
+    # последний (protocol.Mailbox); сколько кадров скопилось и сколько
+    # замещено — в метрики
+    received = mailbox.received
+    messages = mailbox.drain()
+    if mailbox.received > received:
+        slot.queue_depth(mailbox.received - received)
+        slot.set(metrics.CONFLATED, mailbox.conflated)
+    return not mailbox.closed and all(msg.kind != protocol.QUIT for msg in messages)
+
+def new_snapshot(view):
+    # новое состояние из общей памяти или None. Окно рисует его сразу,
+    # а на экран выводит не раньше present_at (view.present_at, до
+    # вывода — view.presenting) — так все экраны меняют раунд разом
+    if view.state.seq == view.seen_seq:
+        return None
+    snap = view.state.read()
+    view.seen_seq = snap.seq
+    # кадр прошлой публикации ещё ждёт вывода — его срок не отодвигается,
+    # иначе при публикациях чаще PRESENT_LEAD экран не сменился бы вовсе
+    if not (view.present_at and snap.present_at):
+        view.present_at = snap.present_at
+    view.presenting = (snap.seq, view.present_at)
+    return snap
+
+def until_present(view):
+    # мс до пробуждения к назначенному выводу: чуть раньше срока — таймаут
+    # event.wait грубый, последние PRESENT_SPIN доспит flip_due. Не меньше
+    # 1 (срок мог уже пройти, а кадр ещё не выведен); 0 — ждать нечего
+    if not view.present_at:
+        return 0
+    return max(1, int((view.present_at - PRESENT_SPIN - time.monotonic()) * 1000))
+
+def flip_due(view):
+    # пора выводить нарисованное; до срока меньше PRESENT_SPIN — доспать точно
+    left = view.present_at - time.monotonic()
+    if 0 < left <= PRESENT_SPIN:
+        time.sleep(left)
+        return True
+    return left <= 0
+
+def heartbeat(view):
+    # окно живо: main сверяет отметку со своими часами (сторож)
+    view.metrics.set(metrics.HEARTBEAT, time.monotonic())
+
+def beat_timeout(timeout):
+    # таймаут event.wait (0 — без срока), чтобы и простаивающее окно
+    # отмечалось не реже HEARTBEAT_INTERVAL
+    interval = int(HEARTBEAT_INTERVAL * 1000)
+    return min(timeout, interval) if timeout else interval
+
+def report_presented(view):
+    # кадр с новой публикацией ушёл на экран — main считает разброс между экранами
+    if view.presenting is None:
+        return
+    seq, present_at = view.presenting
+    view.presenting = None
+    try:
+        CODEC.send(view.conn, protocol.PRESENTED, round_id=seq, t0=time.monotonic(),
+                   t1=present_at)
+    except Exception:
+        pass
 
+def run_window(view):
+    # цикл окна в отдельном процессе: view сам решает, что перерисовать,
+    # и возвращает изменённые прямоугольники. Между кадрами процесс спит
+    # в event.wait, пока нет событий, сообщений от main (WAKE_EVENT) или
+    # таймера самого view (idle_timeout)
+    clock = pygame.time.Clock()
+    waker = PipeWaker([view.conn])
+    first_frame = True
     running = True
+    held = []        # нарисовано, но ещё не выведено (ждёт present_at)
+    held_work = 0.0  # сколько стоила их отрисовка
     while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
-                running = False
+        heartbeat(view)
+        if not view.poll():
+            break
+        waker.rearm()
 
-        # обработка входящих сообщений
-        while conn.poll():
-            msg = conn.recv()
-            # msg может быть:
-            # ('mode', 'splash'/'game'), ('figures', figures), 'quit'
-            if msg == "quit":
+        started = time.perf_counter()
+        rects = view.render()
+        if rects:
+            work = time.perf_counter() - started
+            view.metrics.observe(metrics.DRAW, work)
+            held += rects
+            held_work += work
+        if held and flip_due(view):
+            # после present_at остаётся только вывести готовое
+            flip_started = time.perf_counter()
+            pygame.display.update(held)
+            report_presented(view)
+            view.metrics.observe(metrics.FRAME, held_work + time.perf_counter() - flip_started)
+            held, held_work = [], 0.0
+            if first_frame:
+                first_frame = False
+                report_first_frame(view)
+                view.assets.warm()
+            # не чаще fps текущего термо-уровня, даже если события идут потоком
+            clock.tick(view.level.fps)
+        if not held:
+            # выведено, или публикация ничего не поменяла на экране
+            view.present_at = 0.0
+            view.presenting = None
+            # пока событий нет — собрать кадры следующих раундов
+            view.prefetch()
+
+        for event in [pygame.event.wait(beat_timeout(view.idle_timeout()))] + pygame.event.get():
+            if not view.handle_event(event):
                 running = False
-            elif isinstance(msg, tuple) and msg[0] == "mode":
-                mode = msg[1]
-            elif isinstance(msg, tuple) and msg[0] == "figures":
-                figures = msg[1]
-            elif isinstance(msg, list):
-                # совместимость со старым кодом: если пришли просто figures
-                figures = msg
 
-        screen.fill((255, 255, 255))
+    view.close()
+    pygame.quit()
+    sys.exit()
 
-        if mode == "splash":
-            if splash_img:
-                # масштабируем под окно
-                img = pygame.transform.smoothscale(splash_img, screen.get_size())
-                screen.blit(img, (0, 0))
+# ---------------- HDMI window (HDMI1 & HDMI2) ----------------
+def figure_rect(center, box):
+    return pygame.Rect(center[0] - box // 2, center[1] - box // 2, box, box)
+
+class HdmiView:
+    def __init__(self, conn, state, display, screen, assets, slot):
+        self.conn = conn
+        self.mailbox = protocol.Mailbox(CODEC, conn)  # чтение pipe от main
+        self.state = state
+        self.display = display
+        self.screen = screen
+        self.assets = assets
+        self.metrics = slot  # слот этого окна в общем блоке метрик
+        # размер и центры фигур — от размера экрана
+        self.box, self.centers = geometry.mirror_layout(screen.get_size())
+
+        # режим и фигуры читаем из общей памяти (state), pipe — только QUIT
+        # и WAKE (main опубликовал новое состояние)
+        snap = state.read()
+        self.seen_seq = snap.seq
+        self.mode = snap.mode  # "splash" или "game"
+        self.round_id = snap.round_id
+        self.figures = snap.figures
+        self.upcoming = snap.upcoming  # фигуры следующих раундов
+        self.level = THERMAL_LEVELS[snap.level]
+        # игровые кадры следующих раундов, собранные заранее (ключ — фигуры)
+        self.back = BackBuffers(screen)
+        # когда выводить нарисованное и (seq, present_at) публикации,
+        # пока её кадр не ушёл на экран (new_snapshot)
+        self.present_at = 0.0
+        self.presenting = None
+
+        # перерисовываем только при смене режима/раунда:
+        # full_redraw — весь экран, dirty — только прямоугольники фигур
+        self.full_redraw = True
+        self.dirty = False
+        self.frame_count = 0   # всего кадров
+        self.drawn_count = 0   # кадров, в которых что-то рисовалось
+
+    def handle_event(self, event):
+        if event.type == pygame.QUIT:
+            return False
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+            return False
+        if event.type == pygame.VIDEOEXPOSE:
+            # окно перекрыли/восстановили — содержимое надо вернуть
+            self.full_redraw = True
+        return True
+
+    def poll(self):
+        # обработка входящих сообщений: QUIT или WAKE (состояние
+        # поменялось — его читаем ниже из общей памяти)
+        running = drain_pipe(self.mailbox, self.metrics)
+
+        # main опубликовал новый режим/раунд
+        snap = new_snapshot(self)
+        if snap is not None:
+            self.level = THERMAL_LEVELS[snap.level]
+            self.upcoming = snap.upcoming
+            self.round_id = snap.round_id
+            if snap.mode != self.mode:
+                self.mode = snap.mode
+                self.full_redraw = True
+            if snap.figures != self.figures:
+                self.figures = snap.figures
+                self.dirty = True
+        return running
+
+    def idle_timeout(self):
+        # своих таймеров нет — спим до события, сообщения от main
+        # или назначенного показа
+        return until_present(self)
+
+    def draw_figures(self, surface, figures):
+        for (shape, color), center in zip(figures, self.centers):
+            self.assets.atlas.blit(surface, shape, color, center, self.box)
+
+    def compose(self, surface, figures):
+        # игровой кадр целиком (для back-buffer)
+        surface.fill((255, 255, 255))
+        self.draw_figures(surface, figures)
+
+    def prefetch(self):
+        # кадры следующих раундов (и первого игрового, пока идёт заставка)
+        keys = [tuple(figures) for figures in self.upcoming]
+        if self.mode == "splash":
+            keys.append(tuple(self.figures))
+        self.back.keep(keys, self.compose)
+
+    def render(self):
+        screen = self.screen
+        self.frame_count += 1
+        rects = []
+        # кадр этого раунда уже собран заранее — его просто копируем
+        back = None
+        if self.mode == "game" and (self.full_redraw or self.dirty):
+            back = self.back.get(tuple(self.figures))
+
+        if self.full_redraw:
+            if self.mode == "splash":
+                screen.fill((255, 255, 255))
+                img = self.assets.splash.get(screen.get_size(), self.level.smooth)
+                if img:
+                    screen.blit(img, (0, 0))
+                else:
+                    # если нет картинки, простой текст
+                    font = get_font(None, 48)
+                    screen.blit(self.assets.texts.render(font, "SPLASH (no image)", (0,0,0)), (50,50))
+            elif back is not None:
+                screen.blit(back, (0, 0))
             else:
-                # если нет картинки, простой текст
-                font = pygame.font.SysFont(None, 48)
-                screen.blit(font.render("SPLASH (no image)", True, (0,0,0)), (50,50))
-        else:
-            # режим игры — рисуем фигуры
-            for i, (shape, color) in enumerate(figures):
-                func = DRAW_FUNCS[shape]
-                x = HDMI_SIZE[0] // 3 - 50 if i == 0 else 2 * HDMI_SIZE[0] // 3 + 50
-                func(screen, x, 300, color)
+                # режим игры — рисуем фигуры
+                self.compose(screen, self.figures)
+            rects = [screen.get_rect()]
+        elif self.dirty and self.mode == "game":
+            # сменился только раунд — меняются только области фигур
+            rects = [figure_rect(center, self.box) for center in self.centers]
+            for rect in rects:
+                if back is not None:
+                    screen.blit(back, rect, rect)
+                else:
+                    screen.fill((255, 255, 255), rect)
+            if back is None:
+                self.draw_figures(screen, self.figures)
 
-        pygame.display.flip()
-        clock.tick(60)
+        if rects:
+            self.drawn_count += 1
+        self.full_redraw = False
+        self.dirty = False
+        return rects
 
-    pygame.quit()
-    sys.exit()
+    def close(self):
+        print(f"{self.display.name}: кадров {self.frame_count}, отрисовано {self.drawn_count}, "
+              f"из заранее собранных {self.back.hits}")
+
+def metrics_slot(block, display):
+    # без общего блока (окно запущено не из main) метрики пишутся в никуда
+    return block.slot(display.name) if block is not None else metrics.MetricsSlot.local()
+
+def hdmi_window(conn, state, display, block=None):
+    screen = open_display(display)
+    pygame.display.set_caption(f"{display.name} (mirror)")
+    run_window(HdmiView(conn, state, display, screen, Assets(display.name),
+                        metrics_slot(block, display)))
 
 # ---------------- DSI window (fullscreen, отвечает за старт) ----------------
-def dsi_window(conn):
-    os.environ['SDL_VIDEO_WINDOW_POS'] = "0,0"
-    pygame.init()
-    screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
-    pygame.display.set_caption("DSI")
-    clock = pygame.time.Clock()
+REFRESH_TIMEOUT = 5  # сек без ответа на refresh — разрешаем новый запрос
 
-    # fonts
-    cpu_font = pygame.font.SysFont(None, 36)
-    FONT = pygame.font.SysFont(None, 48)
+class DsiView:
+    def __init__(self, conn, state, display, screen, assets, slot, session=None):
+        self.conn = conn
+        self.mailbox = protocol.Mailbox(CODEC, conn)  # чтение pipe от main
+        self.state = state
+        self.display = display
+        self.screen = screen
+        self.assets = assets
+        self.metrics = slot  # слот этого окна в общем блоке метрик
+        # лог сессии: тапы пишутся туда же, куда main пишет свои решения
+        self.session = session
+        if session is not None:
+            session.screen(screen.get_size())
 
-    # load splash
-    splash_img = None
-    try:
-        splash_img = pygame.image.load(SPLASH_PATH)
-    except Exception as e:
-        print("DSI: не удалось загрузить заставку:", e)
-
-    # кнопка обновления — невидимая зона нижних 2/3
-    button_rect = pygame.Rect(
-        0,
-        screen.get_height() // 3,
-        screen.get_width(),
-        screen.get_height() * 2 // 3
-    )
-    # shutdown button (маленькая)
-    shutdown_rect = pygame.Rect(20, 20, 110, 40)
-
-    mode = "splash"  # splash или game
-    figures = generate_two_wrong()
-
-    # получить начальные данные (на всякий случай)
-    try:
-        if conn.poll(timeout=0.1):
-            init_msg = conn.recv()
-            if isinstance(init_msg, tuple) and init_msg[0] == "figures":
-                figures = init_msg[1]
-            elif isinstance(init_msg, list):
-                figures = init_msg
-            elif isinstance(init_msg, tuple) and init_msg[0] == "mode":
-                mode = init_msg[1]
-    except Exception:
-        pass
+        # fonts (загружаются один раз)
+        self.cpu_font = get_font(None, 36)
+        self.font = get_font(None, 48)
+        self.hint_font = get_font(None, 28)
+        self.shutdown_font = get_font(None, 24)
 
-    # вспомогательная функция для выбора правильной фигуры
-    def compute_correct(figs):
-        used_shapes = {shape for shape, _ in figs}
-        used_colors = {tuple(color) for _, color in figs}
-        for sh in FIGURE_ORDER:
-            nat_color = tuple(NATURAL_COLORS[sh])
-            if sh not in used_shapes and nat_color not in used_colors:
-                return sh, NATURAL_COLORS[sh]
-        for sh in FIGURE_ORDER:
-            if sh not in used_shapes:
-                return sh, NATURAL_COLORS[sh]
-        return FIGURE_ORDER[0], NATURAL_COLORS[FIGURE_ORDER[0]]
-
-    correct = compute_correct(figures)
-    cpu_temp = "CPU: --°C"
-    next_temp_time = 0
+        # кнопка обновления — невидимая зона нижних 2/3
+        self.button_rect = pygame.Rect(
+            0,
+            screen.get_height() // 3,
+            screen.get_width(),
+            screen.get_height() * 2 // 3
+        )
+        # shutdown button (маленькая)
+        self.shutdown_rect = pygame.Rect(20, 20, 110, 40)
+        # размер и центр правильной фигуры — от размера экрана
+        self.box, self.figure_center = geometry.controller_layout(screen.get_size())
 
-    running = True
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
-                running = False
+        # зоны касания для каждого режима: тап ищется в сетке (touch_zones.py),
+        # при перекрытии срабатывает зона с большим приоритетом
+        size = screen.get_size()
+        self.zones = {"splash": TouchZones(size), "game": TouchZones(size)}
+        # на заставке любой тап запускает игру
+        self.zones["splash"].add("start", screen.get_rect(), self.start_game)
+        self.zones["game"].add("refresh", self.button_rect, self.request_refresh)
+        for zones in self.zones.values():
+            zones.add("shutdown", self.shutdown_rect, self.shutdown, priority=10)
 
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                # если в режиме заставки — любой клик запускает игру
-                if mode == "splash":
-                    # отправляем команду start в main
-                    try:
-                        conn.send("start")
-                    except Exception:
-                        pass
-                    # переключаемся локально в game (чтобы не ждать лишний раунд)
-                    mode = "game"
-                else:
-                    # когда в режиме игры — клик в невидимую зону запускает refresh
-                    if button_rect.collidepoint(event.pos):
-                        try:
-                            conn.send("refresh")
-                        except Exception:
-                            pass
-                        # ждём ответ (новые фигуры)
-                        if conn.poll(timeout=5):
-                            msg = conn.recv()
-                            if isinstance(msg, list):
-                                figures = msg
-                                correct = compute_correct(figures)
-                            elif isinstance(msg, tuple) and msg[0] == "figures":
-                                figures = msg[1]
-                                correct = compute_correct(figures)
-                        else:
-                            pass
-
-                # shutdown
-                if shutdown_rect.collidepoint(event.pos):
-                    pygame.quit()
-                    subprocess.call(["sudo", "shutdown", "-h", "now"])
-                    sys.exit()
+        # начальные режим и фигуры — из общей памяти
+        snap = state.read()
+        self.seen_seq = snap.seq
+        self.mode = snap.mode  # splash или game
+        self.round_id = snap.round_id
+        self.figures = snap.figures
+        self.correct = compute_correct(self.figures)
+        self.upcoming = snap.upcoming  # фигуры следующих раундов
+        self.level = THERMAL_LEVELS[snap.level]
+        # кадры следующих раундов, собранные заранее (ключ — как у drawn)
+        self.back = BackBuffers(screen)
+        # назначенный вывод (new_snapshot)
+        self.present_at = 0.0
+        self.presenting = None
+
+        self.cpu_temp = "CPU: --°C"
+        self.next_temp_time = 0
+        # температуру и прочие метрики читает фоновый поток, кадр берёт готовый замер
+        self.sampler = SystemSampler(SYSFS_ROOT).start()
+
+        # асинхронный refresh: запрос уходит в main, цикл продолжает рисовать,
+        # новый раунд (state.req_id >= id запроса) применяется в том кадре,
+        # где он появился. Пока ответа нет, повторные тапы запросов не шлют.
+        # после перезапуска окна сторожем — продолжаем с последнего отвеченного id
+        self.refresh_id = snap.req_id  # id последнего отправленного запроса
+        self.refresh_pending = False
+        self.refresh_sent_at = 0
+
+        # что нарисовано сейчас: (режим, фигура, температура);
+        # None — экран надо перерисовать целиком
+        self.drawn = None
+
+    def handle_event(self, event):
+        if event.type == pygame.QUIT:
+            return False
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+            return False
+        if event.type == pygame.VIDEOEXPOSE:
+            self.drawn = None
+
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            if self.session is not None:
+                self.session.touch(event.pos, event.button)
+            zone = self.zones[self.mode].hit(event.pos)
+            if zone is not None:
+                zone.command()
+        return True
+
+    def start_game(self):
+        # отправляем команду start в main
+        try:
+            CODEC.send(self.conn, protocol.START, t0=time.monotonic())
+        except Exception:
+            pass
+        # в game окно переходит вместе с зеркалами — по публикации main
+
+    def shutdown(self):
+        pygame.quit()
+        subprocess.call(["sudo", "shutdown", "-h", "now"])
+        sys.exit()
 
+    def request_refresh(self):
+        now = time.monotonic()
+        # ответа нет дольше REFRESH_TIMEOUT — считаем запрос потерянным
+        if self.refresh_pending and now - self.refresh_sent_at > REFRESH_TIMEOUT:
+            self.refresh_pending = False
+        if self.refresh_pending:
+            return
+        self.refresh_id += 1
+        try:
+            CODEC.send(self.conn, protocol.REFRESH, t0=now, req_id=self.refresh_id)
+            self.refresh_pending = True
+            self.refresh_sent_at = now
+        except Exception:
+            pass
+
+    def poll(self):
         # обработка входящих сообщений (main -> dsi)
-        while conn.poll():
-            msg = conn.recv()
-            if msg == "quit":
-                running = False
-            elif isinstance(msg, tuple) and msg[0] == "mode":
-                mode = msg[1]
-            elif isinstance(msg, tuple) and msg[0] == "figures":
-                figures = msg[1]
-                correct = compute_correct(figures)
-            elif isinstance(msg, list):
-                figures = msg
-                correct = compute_correct(figures)
+        running = drain_pipe(self.mailbox, self.metrics)
+
+        # main опубликовал новый режим/раунд
+        snap = new_snapshot(self)
+        if snap is not None:
+            self.mode = snap.mode
+            self.round_id = snap.round_id
+            self.level = THERMAL_LEVELS[snap.level]
+            self.upcoming = snap.upcoming
+            if snap.figures != self.figures:
+                self.figures = snap.figures
+                self.correct = compute_correct(self.figures)
+            if self.refresh_pending and snap.req_id >= self.refresh_id:
+                self.refresh_pending = False
+                self.metrics.observe(metrics.REFRESH, time.monotonic() - self.refresh_sent_at)
+        return running
+
+    def idle_timeout(self):
+        # мс до следующего обновления температуры или назначенного показа
+        # (0 в event.wait — ждать без срока)
+        timeout = max(1, int((self.next_temp_time - time.time()) * 1000))
+        present = until_present(self)
+        return min(timeout, present) if present else timeout
 
-        screen.fill((255, 255, 255))
+    def render(self):
+        screen = self.screen
+
+        # обновление температуры раз в 5 сек; main по ней выбирает термо-уровень
+        if time.time() >= self.next_temp_time:
+            t = self.sampler.latest.celsius
+            if t is None:
+                self.cpu_temp = "--°C"
+            else:
+                self.cpu_temp = f"{t:.1f}°C"
+                try:
+                    CODEC.send(self.conn, protocol.TEMP, t0=t)
+                except Exception:
+                    pass
+            self.next_temp_time = time.time() + 5
+
+        # ничего не поменялось — кадр не рисуем
+        key = (self.mode, self.correct, self.cpu_temp)
+        if key == self.drawn:
+            return []
+        self.drawn = key
+
+        back = self.back.get(key)
+        if back is not None:
+            # кадр этого раунда уже собран заранее
+            screen.blit(back, (0, 0))
+        else:
+            self.compose(screen, key)
+        return [screen.get_rect()]
+
+    def compose(self, surface, key):
+        # весь кадр для (режим, правильная фигура, температура)
+        mode, correct, cpu_temp = key
+        texts = self.assets.texts
+        surface.fill((255, 255, 255))
 
         if mode == "splash":
-            if splash_img:
-                img = pygame.transform.smoothscale(splash_img, screen.get_size())
-                screen.blit(img, (0, 0))
+            img = self.assets.splash.get(surface.get_size(), self.level.smooth)
+            if img:
+                surface.blit(img, (0, 0))
             else:
-                screen.blit(FONT.render("SPLASH (no image)", True, (0,0,0)), (50,50))
+                surface.blit(texts.render(self.font, "SPLASH (no image)", (0,0,0)), (50,50))
             # подсказка
-            hint = pygame.font.SysFont(None, 28).render("СТАРТ", True, (0,0,0))
-            screen.blit(hint, (screen.get_width()//2 - hint.get_width()//2, screen.get_height() - 80))
+            hint = texts.render(self.hint_font, "СТАРТ", (0,0,0))
+            surface.blit(hint, (surface.get_width()//2 - hint.get_width()//2, surface.get_height() - 80))
         else:
             # рисуем правильную фигуру
-            func = DRAW_FUNCS[correct[0]]
-            func(screen, screen.get_width() // 2, 220, correct[1])
+            self.assets.atlas.blit(surface, correct[0], correct[1], self.figure_center, self.box)
 
             # кнопка выключения
-            pygame.draw.rect(screen, (255, 0, 0), shutdown_rect)
-            pygame.draw.rect(screen, (0, 0, 0), shutdown_rect, 3)
-            screen.blit(pygame.font.SysFont(None, 24).render("SHUTDOWN", True, (255, 255, 255)),
-                        (shutdown_rect.x + 5, shutdown_rect.y + 15))
+            shutdown_rect = self.shutdown_rect
+            pygame.draw.rect(surface, (255, 0, 0), shutdown_rect)
+            pygame.draw.rect(surface, (0, 0, 0), shutdown_rect, 3)
+            surface.blit(texts.render(self.shutdown_font, "SHUTDOWN", (255, 255, 255)),
+                         (shutdown_rect.x + 5, shutdown_rect.y + 15))
 
-        # обновление температуры раз в 5 сек
-        if time.time() >= next_temp_time:
-            try:
-                with open("/sys/class/thermal/thermal_zone0/temp") as f:
-                    t = int(f.read()) / 1000
-                cpu_temp = f"{t:.1f}°C"
-            except:
-                cpu_temp = "--°C"
-            next_temp_time = time.time() + 5
+        text_surface = texts.render(self.cpu_font, cpu_temp, (0, 0, 0))
+        surface.blit(text_surface, (surface.get_width() - text_surface.get_width() - 20, 20))
+
+    def prefetch(self):
+        # кадры следующих раундов (и первого игрового, пока идёт заставка);
+        # температура — текущая: сменится она — кадры соберутся заново
+        keys = [("game", compute_correct(figures), self.cpu_temp) for figures in self.upcoming]
+        if self.mode == "splash":
+            keys.append(("game", self.correct, self.cpu_temp))
+        self.back.keep([key for key in keys if key != self.drawn], self.compose)
+
+    def close(self):
+        self.sampler.stop()
+        texts = self.assets.texts
+        print(f"{self.display.name}: надписи из кэша {texts.hits}, отрендерено {texts.misses}, "
+              f"кадров из заранее собранных {self.back.hits}")
+
+def dsi_window(conn, state, display, block=None, session=None):
+    screen = open_display(display)
+    pygame.display.set_caption(display.name)
+    run_window(DsiView(conn, state, display, screen, Assets(display.name),
+                       metrics_slot(block, display), session))
+
+# ---------------- все окна в одном процессе (pygame 2, _sdl2) ----------------
+# Вместо процесса на экран — один процесс, одно pygame.init(), одни шрифты,
+# одна декодированная заставка и один атлас на все окна. Каждое окно рисуется
+# в свою поверхность, изменения уходят в текстуру окна.
+def multi_window(conns, state, displays, block=None, session=None):
+    from pygame._sdl2.video import Renderer, Texture, Window
+
+    pygame.display.init()
+    pygame.font.init()
+    assets = Assets("windows")
+    desktop = pygame.display.get_desktop_sizes()[0]
+
+    slots = []  # [window, renderer, texture, view, held]
+    for conn, display in zip(conns, displays):
+        size = display.size or desktop
+        x, y = (int(v) for v in display.pos.split(","))
+        window = Window(display.name, size=size, position=(x, y), borderless=True)
+        if display.size is None:
+            window.set_fullscreen(desktop=True)
+        renderer = Renderer(window)
+        texture = Texture(renderer, size, streaming=True)
+        canvas = pygame.Surface(size)
+        slot = metrics_slot(block, display)
+        if display.role == "controller":
+            view = DsiView(conn, state, display, canvas, assets, slot, session)
+        else:
+            view = HdmiView(conn, state, display, canvas, assets, slot)
+        # held — цена отрисовки кадра, ещё не выведенного в окно (ждёт present_at)
+        slots.append([window, renderer, texture, view, None])
+
+    clock = pygame.time.Clock()
+    waker = PipeWaker(conns)  # один поток на все pipe процесса
+    presented = set()  # окна, уже показавшие первый кадр
+    events = []
+    while slots:
+        closed = []
+        for event in events:
+            # событие окна/тача — только своему окну, остальные (QUIT) — всем
+            target = getattr(event, "window", None)
+            for slot in slots:
+                if target is None or target is slot[0]:
+                    if not slot[3].handle_event(event) and slot not in closed:
+                        closed.append(slot)
+
+        for slot in slots:
+            heartbeat(slot[3])
+            if not slot[3].poll() and slot not in closed:
+                closed.append(slot)
+        waker.rearm()
+
+        for slot in slots:
+            view = slot[3]
+            started = time.perf_counter()
+            if view.render():
+                work = time.perf_counter() - started
+                view.metrics.observe(metrics.DRAW, work)
+                slot[4] = (slot[4] or 0.0) + work
 
-        text_surface = cpu_font.render(cpu_temp, True, (0, 0, 0))
-        screen.blit(text_surface, (screen.get_width() - text_surface.get_width() - 20, 20))
+        # вывод — когда нарисованы все окна: после present_at между
+        # экранами остаётся только загрузка текстур
+        drawn = False
+        for slot in slots:
+            window, renderer, texture, view, held = slot
+            if held is not None and flip_due(view):
+                drawn = True
+                started = time.perf_counter()
+                texture.update(view.screen)
+                texture.draw()
+                renderer.present()
+                report_presented(view)
+                view.metrics.observe(metrics.FRAME, held + time.perf_counter() - started)
+                slot[4] = None
+                if view not in presented:
+                    presented.add(view)
+                    report_first_frame(view)
+                    if len(presented) == len(slots):
+                        assets.warm()
+            if slot[4] is None:
+                view.present_at = 0.0
+                view.presenting = None
 
-        pygame.display.flip()
-        clock.tick(60)
+        for slot in closed:
+            slot[3].close()
+            slot[0].destroy()
+            slots.remove(slot)
+            # main получит EOF и перестанет будить закрытое окно
+            waker.remove(slot[3].conn)
+            slot[3].conn.close()
+        if drawn and slots:
+            # не чаще fps текущего термо-уровня (он у всех окон общий)
+            clock.tick(slots[0][3].level.fps)
+
+        # спим до события, сообщения от main или ближайшего таймера окон;
+        # перед сном каждое окно без невыведенного кадра собирает кадры
+        # следующих раундов
+        for slot in slots:
+            if slot[4] is None:
+                slot[3].prefetch()
+        if slots:
+            timeouts = [t for t in (slot[3].idle_timeout() for slot in slots) if t]
+            events = [pygame.event.wait(beat_timeout(min(timeouts, default=0)))] + pygame.event.get()
 
     pygame.quit()
     sys.exit()
 
 # ---------------- MAIN ----------------
-if __name__ == "__main__":
-    # pipes
-    main_h1_parent, h1_child = Pipe()
-    main_h2_parent, h2_child = Pipe()
-    main_dsi_parent, dsi_child = Pipe()
-
-    # processes
-    p_hdmi1 = Process(target=hdmi_window, args=(h1_child, HDMI1_POS), daemon=True)
-    p_hdmi2 = Process(target=hdmi_window, args=(h2_child, HDMI2_POS), daemon=True)
-    p_dsi = Process(target=dsi_window, args=(dsi_child,), daemon=True)
+def print_latency(name, samples):
+    if not samples:
+        print(f"{name}: нет данных")
+        return
+    ms = sorted(x * 1000 for x in samples)
+    print(f"{name}: n={len(ms)} медиана {ms[len(ms) // 2]:.2f} мс, "
+          f"p95 {ms[int(len(ms) * 0.95)]:.2f} мс, макс {ms[-1]:.2f} мс")
 
-    p_hdmi1.start()
-    p_hdmi2.start()
-    p_dsi.start()
+def wake_windows(conns):
+    # состояние уже в общей памяти — по pipe только будим окна,
+    # которые спят в event.wait
+    for conn in conns:
+        try:
+            CODEC.send(conn, protocol.WAKE)
+        except Exception:
+            pass
 
-    # initial mode = splash
-    mode = "splash"
-    figures = generate_two_wrong()
+def publish_round(state, session, deck, mode, round_id, req_id=0, level=0):
+    # новое состояние — в общую память для окон и в лог сессии; вместе с
+    # раундом публикуются фигуры следующих (колода детерминирована), чтобы
+    # окна заранее собрали их кадры
+    figures = deck[round_id].figures
+    upcoming = [deck[round_id + i].figures for i in range(1, UPCOMING + 1)]
+    present_at = time.monotonic() + PRESENT_LEAD if PRESENT_LEAD else 0.0
+    state.publish(mode, round_id, figures, req_id, level, upcoming, present_at)
+    if session is not None:
+        session.publish(mode, round_id, figures, req_id, level)
 
-    # отправляем режим splash всем
+def open_session(seed):
+    if SESSION_DIR is None:
+        return None
     try:
-        main_h1_parent.send(("mode", "splash"))
-        main_h2_parent.send(("mode", "splash"))
-        main_dsi_parent.send(("mode", "splash"))
-    except Exception:
-        pass
+        path = session_log.new_session_path(SESSION_DIR, SESSION_KEEP)
+        session = session_log.SessionLog(path, FIGURE_ORDER,
+                                         [NATURAL_COLORS[f] for f in FIGURE_ORDER], seed)
+    except OSError as e:
+        print("лог сессии: не удалось открыть:", e)
+        return None
+    print(f"лог сессии: {path}")
+    return session
 
-    # также можно отправить начальные фигуры (необязательно при splash)
+async def open_unix_server(handler, path, what):
+    # UNIX-сокет, подключения обслуживает цикл main; None — не открывать
+    if path is None:
+        return None
     try:
-        main_h1_parent.send(("figures", figures))
-        main_h2_parent.send(("figures", figures))
-        main_dsi_parent.send(("figures", figures))
-    except Exception:
+        os.unlink(path)
+    except FileNotFoundError:
         pass
-
     try:
-        while True:
-            # DSI может прислать "start" или "refresh"
-            if main_dsi_parent.poll():
-                msg = main_dsi_parent.recv()
-                if msg == "refresh":
-                    figures = generate_two_wrong()
-                    # разослать всем новые фигуры (и DSI тоже)
-                    try:
-                        main_h1_parent.send(("figures", figures))
-                        main_h2_parent.send(("figures", figures))
-                        main_dsi_parent.send(("figures", figures))
-                    except Exception:
-                        pass
-                elif msg == "start":
-                    # переключаем все окна в game
-                    mode = "game"
-                    try:
-                        main_h1_parent.send(("mode", "game"))
-                        main_h2_parent.send(("mode", "game"))
-                        main_dsi_parent.send(("mode", "game"))
-                        # и отправляем текущие фигуры
-                        main_h1_parent.send(("figures", figures))
-                        main_h2_parent.send(("figures", figures))
-                        main_dsi_parent.send(("figures", figures))
-                    except Exception:
-                        pass
-                # если main получает другие команды - можно расширить
-            time.sleep(0.05)
-    except KeyboardInterrupt:
+        return await asyncio.start_unix_server(handler, path)
+    except OSError as e:
+        print(f"{what}: не удалось открыть сокет:", e)
+        return None
+
+def spawn_windows(mp, displays, state, block, session, single=False):
+    # процессы окон для displays -> {parent conn: (display, process)}.
+    # pipe на каждый дисплей: controller -> main команды, main -> окна
+    # только WAKE и QUIT. Конец pipe окна main сразу закрывает у себя —
+    # иначе после смерти окна main не получит EOF
+    windows = {}
+    if single:
+        # все окна в одном процессе
+        pipes = [mp.Pipe() for _ in displays]
+        proc = mp.Process(target=multi_window,
+                          args=([child for _, child in pipes], state, displays, block, session),
+                          daemon=True)
+        proc.start()
+        for (parent_conn, child_conn), display in zip(pipes, displays):
+            child_conn.close()
+            windows[parent_conn] = (display, proc)
+        return windows
+    # по процессу на окно
+    for display in displays:
+        parent_conn, child_conn = mp.Pipe()
+        args = (child_conn, state, display, block)
+        if display.role == "controller":
+            target, args = dsi_window, args + (session,)
+        else:
+            target = hdmi_window
+        proc = mp.Process(target=target, args=args, daemon=True)
+        proc.start()
+        child_conn.close()
+        windows[parent_conn] = (display, proc)
+    return windows
+
+def window_processes(windows):
+    # процесс окна -> его дисплеи (с --single — один процесс на все)
+    procs = {}
+    for display, proc in windows.values():
+        procs.setdefault(proc, []).append(display)
+    return procs
+
+def last_heartbeat(block, displays, spawned_at):
+    # последняя отметка процесса окна; пока окно открывает дисплей — момент запуска
+    return max([spawned_at] + [block.slot(d.name).get(metrics.HEARTBEAT) for d in displays])
+
+def process_started_at():
+    # момент запуска этого процесса (с учётом старта интерпретатора и
+    # import pygame) по часам CLOCK_BOOTTIME, сек
+    with open("/proc/self/stat") as f:
+        start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+    return start_ticks / os.sysconf("SC_CLK_TCK")
+
+def reset_signals_after_fork():
+    # окно — fork от main, где SIGINT ловит цикл asyncio через wakeup fd;
+    # окну — обычный KeyboardInterrupt и никакой записи в сокет цикла main
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+
+class Coordinator:
+    # main — единственный писатель состояния раунда. Всё в одном цикле
+    # asyncio, без потоков: pipe окон, их процессы (sentinel — для сторожа),
+    # сокет метрик и управляющий сокет оператора. Обработчики короткие и
+    # не блокируются, поэтому команда оператора применяется так же, как тап
+    # на DSI, — сразу и без перезапуска окон
+    def __init__(self, started, single=False):
+        self.started = started
+        self.single = single
+        # общее состояние раунда: main пишет, все окна читают
+        self.state = RoundState(FIGURE_ORDER, [NATURAL_COLORS[f] for f in FIGURE_ORDER])
+
+        # initial mode = splash (публикуем до старта окон — они сразу его прочитают)
+        self.mode = "splash"
+        # раунды идут по перемешанной колоде без повторов, номер раунда —
+        # позиция в ней; seed выбирается до fork, так что колода одна во всех процессах
+        seed = ROUND_SEED if ROUND_SEED is not None else random.randrange(2 ** 32)
+        print(f"колода раундов: seed {seed}")
+        self.deck = RoundDeck(ROUNDS, seed)
+        self.round_id = 1
+        # термо-уровень выбирает только main, окна читают его номер из state
+        self.governor = ThermalGovernor(THERMAL_LEVELS, THERMAL_HYSTERESIS)
+        # id последнего обслуженного refresh — остаётся в state при любой
+        # следующей публикации, иначе DSI мог бы не увидеть ответ на свой запрос
+        self.answered_req = 0
+        self.session = open_session(seed)
+
+        # метрики: по слоту на main и на каждый дисплей в общей памяти
+        self.metrics_block = metrics.MetricsBlock(["main"] + [d.name for d in DISPLAYS])
+        self.main_metrics = self.metrics_block.slot("main")
+
+        # окна стартуют через fork от main: pygame и модули уже загружены здесь,
+        # поэтому окну остаётся только открыть дисплей (без повторного import
+        # pygame, как было бы при spawn/forkserver — в Python 3.14 это умолчание).
+        # Так же, от main, сторож запускает заново упавшее окно: новое читает
+        # текущие режим и раунд из state
+        self.mp = multiprocessing.get_context("fork")
+        self.loop = None
+        self.windows = {}  # parent conn -> (display, process)
+        self.conns = []    # conn окон, что ещё не закрылись (их будим)
+        self.spawned = {}  # процесс -> момент запуска
+        self.killed = set()   # зависшие процессы, которым отправлен SIGKILL
+        self.framed = set()   # процессы, показавшие первый кадр
+        self.pending = 0      # окон, ждущих перезапуска
+        self.died = {}        # имя дисплея -> когда main увидел смерть его окна
+        self.restarts = 0
+        self.recoveries = deque(maxlen=LATENCY_SAMPLES)  # смерть окна -> первый кадр нового, сек
+        self.wake_scheduled = False
+
+        # задержка "тап на DSI -> рассылка всем окнам", сек
+        self.tap_latencies = deque(maxlen=LATENCY_SAMPLES)
+        # смена раунда на экранах: seq публикации -> {conn: момент кадра};
+        # разброс (последний экран - первый) и опоздание последнего экрана
+        # относительно present_at, сек
+        self.flips = {}
+        self.skews = deque(maxlen=LATENCY_SAMPLES)
+        self.lateness = deque(maxlen=LATENCY_SAMPLES)
+
+        # управляющий сокет: имя команды -> обработчик (аргументы — строки)
+        self.commands = {
+            "round": self.cmd_round,
+            "mode": self.cmd_mode,
+            "state": self.cmd_state,
+            "metrics": self.cmd_metrics,
+        }
+        self.publish()
+
+    # ---------- состояние ----------
+    def publish(self):
+        # текущие режим, раунд, ответ на refresh и термо-уровень — в общую
+        # память и лог сессии. Окна будятся один раз за проход цикла, сколько
+        # бы публикаций в нём ни было (команды оператора идут пачками)
+        publish_round(self.state, self.session, self.deck, self.mode, self.round_id,
+                      self.answered_req, self.governor.index)
+        if self.loop is not None and not self.wake_scheduled:
+            self.wake_scheduled = True
+            self.loop.call_soon(self.wake)
+
+    def wake(self):
+        self.wake_scheduled = False
+        wake_windows(self.conns)
+
+    # ---------- окна ----------
+    def add_windows(self, windows):
+        self.windows.update(windows)
+        for conn in windows:
+            # цикл main не ждёт окно: WAKE в переполненный pipe (окно зависло
+            # под потоком команд) не уходит, а окно, проснувшись, всё равно
+            # прочитает последнее состояние из state
+            os.set_blocking(conn.fileno(), False)
+            self.conns.append(conn)
+            self.loop.add_reader(conn.fileno(), self.on_readable, conn)
+        for proc in window_processes(windows):
+            self.spawned[proc] = time.monotonic()
+            self.loop.add_reader(proc.sentinel, self.on_exit, proc)
+
+    def drop_conn(self, conn):
+        # окно закрыло pipe — больше его не читаем и не будим
+        if conn in self.conns:
+            self.loop.remove_reader(conn.fileno())
+            self.conns.remove(conn)
+
+    def on_readable(self, conn):
+        depth = 0
+        while conn in self.conns and conn.poll():
+            try:
+                msg = CODEC.recv(conn)
+            except (EOFError, ConnectionResetError):
+                # окно завершилось (с непрочитанным QUIT — reset) — больше его не ждём
+                self.drop_conn(conn)
+                break
+            except BlockingIOError:
+                break  # кадр дописывается — дочитаем при следующей готовности
+            except protocol.ProtocolError as e:
+                print(f"{self.windows[conn][0].name}: неверное сообщение:", e)
+                continue
+            depth += 1
+            self.on_message(conn, msg)
+        if depth:
+            self.main_metrics.queue_depth(depth)
+
+    def on_message(self, conn, msg):
+        display = self.windows[conn][0]
+        if msg.kind == protocol.FIRST_FRAME:
+            self.framed.add(self.windows[conn][1])
+            if display.name in self.died:
+                self.recoveries.append(msg.t0 - self.died.pop(display.name))
+                # режим и раунд — с первого кадра нового окна, а не из состояния main
+                shown = "game" if msg.figures else "splash"
+                mismatch = ""
+                if msg.figures and tuple(msg.figures) != self.deck[msg.round_id].figures:
+                    mismatch = ", фигуры не этого раунда"
+                print(f"{display.name}: окно восстановлено за {self.recoveries[-1] * 1000:.0f} мс "
+                      f"(режим {shown}, раунд {msg.round_id}{mismatch})")
+                return
+            since_boot = msg.t1
+            print(f"{display.name}: первый кадр через "
+                  f"{(since_boot - self.started) * 1000:.0f} мс после запуска "
+                  f"({since_boot:.2f} с после включения)")
+            return
+        if msg.kind == protocol.PRESENTED:
+            shown = self.flips.setdefault(msg.round_id, {})
+            shown[conn] = msg.t0
+            if len(self.flips) > LATENCY_SAMPLES:
+                # публикации, которые не все экраны показали (окно зависло) —
+                # самая старая больше не ждёт
+                del self.flips[next(iter(self.flips))]
+            if len(shown) == len(self.conns):
+                self.skews.append(max(shown.values()) - min(shown.values()))
+                self.main_metrics.observe(metrics.SKEW, self.skews[-1])
+                if msg.t1:
+                    self.lateness.append(max(shown.values()) - msg.t1)
+                # более ранние публикации, что не всех экранов
+                # коснулись (например, смена термо-уровня), не ждём
+                for seq in [seq for seq in self.flips if seq <= msg.round_id]:
+                    del self.flips[seq]
+            return
+        if display.role != "controller":
+            return
+        if msg.kind == protocol.TEMP:
+            # DSI прислал температуру CPU
+            self.main_metrics.set(metrics.TEMPERATURE, msg.t0)
+            if self.governor.update(msg.t0):
+                level = self.governor.level
+                print(f"термо-уровень {level.name} ({msg.t0:.1f}°C): "
+                      f"{level.fps} fps, smoothscale {'да' if level.smooth else 'нет'}")
+                self.publish()
+            return
+
+        # DSI может прислать START или REFRESH
+        # (t0 — момент тапа, у REFRESH ещё и id запроса)
+        if msg.kind == protocol.REFRESH:
+            # новый раунд — одна запись в общую память для всех окон
+            if self.session is not None:
+                self.session.request(session_log.REFRESH, msg.req_id)
+            self.round_id += 1
+            self.answered_req = msg.req_id
+            self.publish()
+        elif msg.kind == protocol.START:
+            # переключаем все окна в game с текущими фигурами
+            if self.session is not None:
+                self.session.request(session_log.START)
+            self.mode = "game"
+            self.publish()
+        else:
+            # если main получает другие команды - можно расширить
+            return
+        self.tap_latencies.append(time.monotonic() - msg.t0)
+        if msg.kind == protocol.REFRESH:
+            self.main_metrics.observe(metrics.REFRESH, self.tap_latencies[-1])
+
+    # ---------- сторож ----------
+    def on_exit(self, proc):
+        # процесс окна завершился: дочитать, что он успел прислать, и
+        # запустить заново, если он упал или убит сторожем
+        self.loop.remove_reader(proc.sentinel)
+        proc.join()
+        conns = [conn for conn, (_, p) in self.windows.items() if p is proc]
+        displays = [self.windows[conn][0] for conn in conns]
+        for conn in conns:
+            self.on_readable(conn)
+            self.drop_conn(conn)
+            del self.windows[conn]
+            conn.close()
+        self.killed.discard(proc)
+        del self.spawned[proc]
+        shown = proc in self.framed
+        self.framed.discard(proc)
+        if self.finished.done():
+            return  # main завершается, окна закрываются вместе с ним
+        if proc.exitcode == 0:
+            # окно закрыли (ESC, shutdown) — не перезапускаем
+            if not self.windows and not self.pending:
+                self.finish(False)  # все окна закрылись сами
+            return
+        print(f"{', '.join(d.name for d in displays)}: окно завершилось "
+              f"с кодом {proc.exitcode}, перезапуск")
+        now = time.monotonic()
+        for display in displays:
+            self.died.setdefault(display.name, now)
+        self.pending += 1
+        # падает, не дойдя до первого кадра (нет дисплея и т.п.) —
+        # не перезапускать в цикле без паузы
+        self.loop.call_later(0 if shown else HEARTBEAT_TIMEOUT, self.restart, displays)
+
+    def restart(self, displays):
+        self.pending -= 1
+        if self.finished.done():
+            return
+        self.add_windows(spawn_windows(self.mp, displays, self.state, self.metrics_block,
+                                       self.session, self.single))
+        self.restarts += 1
+        self.main_metrics.set(metrics.RESTARTS, self.restarts)
+
+    def watchdog(self):
+        # окно, что молчит дольше HEARTBEAT_TIMEOUT, зависло: убиваем,
+        # перезапуск — как у упавшего (on_exit). Следующая проверка — к
+        # сроку того окна, что отмечалось давнее всех
+        now = time.monotonic()
+        next_check = now + HEARTBEAT_TIMEOUT
+        for proc, displays in window_processes(self.windows).items():
+            if proc in self.killed:
+                continue
+            beat = last_heartbeat(self.metrics_block, displays, self.spawned[proc])
+            if now - beat > HEARTBEAT_TIMEOUT:
+                print(f"{', '.join(d.name for d in displays)}: нет отметки "
+                      f"{now - beat:.1f} с — окно зависло, перезапуск")
+                proc.kill()
+                self.killed.add(proc)
+            else:
+                next_check = min(next_check, beat + HEARTBEAT_TIMEOUT)
+        self.loop.call_later(next_check - now, self.watchdog)
+
+    # ---------- метрики ----------
+    def export(self):
         try:
-            main_h1_parent.send("quit")
-        except Exception:
-            pass
+            self.metrics_block.write_textfile(METRICS_TEXTFILE)
+        except OSError as e:
+            print("метрики: не удалось записать файл:", e)
+            return
+        self.loop.call_later(METRICS_INTERVAL, self.export)
+
+    async def serve_metrics(self, reader, writer):
+        # каждое подключение получает текущие метрики текстом Prometheus
+        # (например: socat - UNIX-CONNECT:/tmp/figures-metrics.sock);
+        # медленный клиент ждёт в цикле, а не держит main
+        writer.write(self.metrics_block.prometheus().encode())
         try:
-            main_h2_parent.send("quit")
-        except Exception:
+            await writer.drain()
+        except ConnectionError:
             pass
+        writer.close()
+
+    # ---------- управляющий сокет ----------
+    async def serve_control(self, reader, writer):
+        # команда — строка, на каждую — ответ в том же порядке. Клиент может
+        # слать следующие, не дожидаясь ответов (например:
+        # echo "round" | socat - UNIX-CONNECT:/tmp/figures-control.sock)
         try:
-            main_dsi_parent.send("quit")
-        except Exception:
-            pass
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                writer.write(self.command(line))
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass  # клиент отключился или прислал слишком длинную строку
+        writer.close()
+
+    def command(self, line):
+        # ответ: "ok ..." или "error ..." одной строкой; у metrics за
+        # строкой "ok <байт>" идёт текст Prometheus этой длины
+        started = time.perf_counter()
+        name, *args = line.decode(errors="replace").split() or [""]
+        handler = self.commands.get(name)
+        if handler is None:
+            reply = f"error неизвестная команда {name!r}, есть: {' '.join(self.commands)}\n"
+        else:
+            try:
+                reply = handler(*args)
+            except ValueError as e:
+                reply = f"error {name}: {e}\n"
+            except Exception as e:
+                # любая ошибка команды — ответ клиенту, а не исключение в цикле main
+                reply = f"error {name}: {type(e).__name__}: {e}\n"
+        self.main_metrics.observe(metrics.CONTROL, time.perf_counter() - started)
+        return reply.encode()
+
+    def cmd_round(self, *args):
+        # round — следующий раунд колоды, round N — раунд N
+        if len(args) > 1:
+            raise ValueError("round [N]")
+        round_id = int(args[0]) if args else self.round_id + 1
+        if not 1 <= round_id < 2 ** 31:
+            raise ValueError(f"нет раунда {round_id}")
+        # раунд и следующие (их фигуры уходят в state) собираются до смены
+        # состояния: не собрались — остаётся прежний раунд
+        for i in range(UPCOMING + 1):
+            self.deck[round_id + i]
+        self.round_id = round_id
+        self.publish()
+        return f"ok round {round_id}\n"
+
+    def cmd_mode(self, *args):
+        if len(args) != 1 or args[0] not in session_log.MODES:
+            raise ValueError(f"mode {'|'.join(session_log.MODES)}")
+        self.mode = args[0]
+        self.publish()
+        return f"ok mode {self.mode}\n"
+
+    def cmd_state(self, *args):
+        names = ",".join(display.name for display, _ in self.windows.values()) or "-"
+        return (f"ok mode={self.mode} round={self.round_id} req={self.answered_req} "
+                f"level={self.governor.level.name} seq={self.state.seq} windows={names} "
+                f"restarts={self.restarts}\n")
+
+    def cmd_metrics(self, *args):
+        text = self.metrics_block.prometheus()
+        return f"ok {len(text.encode())}\n{text}"
 
-        p_hdmi1.join(timeout=1)
-        p_hdmi2.join(timeout=1)
-        p_dsi.join(timeout=1)
-        sys.exit(0)
+    # ---------- запуск и завершение ----------
+    def finish(self, interrupted):
+        if not self.finished.done():
+            self.finished.set_result(interrupted)
 
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        self.finished = self.loop.create_future()
+        # Ctrl-C: напечатать задержки и закрыть окна (finish(True))
+        self.loop.add_signal_handler(signal.SIGINT, self.finish, True)
+        os.register_at_fork(after_in_child=reset_signals_after_fork)
+        servers = [(await open_unix_server(self.serve_metrics, METRICS_SOCKET, "метрики"),
+                    METRICS_SOCKET),
+                   (await open_unix_server(self.serve_control, CONTROL_SOCKET, "управление"),
+                    CONTROL_SOCKET)]
+        self.add_windows(spawn_windows(self.mp, DISPLAYS, self.state, self.metrics_block,
+                                       self.session, self.single))
+        self.watchdog()
+        if METRICS_TEXTFILE:
+            self.export()
+
+        interrupted = await self.finished
+        for conn in list(self.conns):
+            self.drop_conn(conn)
+        for proc in window_processes(self.windows):
+            self.loop.remove_reader(proc.sentinel)
+        for server, path in servers:
+            if server is not None:
+                server.close()
+                os.unlink(path)
+        if interrupted:
+            print_latency("тап -> рассылка", self.tap_latencies)
+            print_latency("разброс смены раунда между экранами", self.skews)
+            print_latency("опоздание последнего экрана к present_at", self.lateness)
+            if self.restarts:
+                print(f"перезапусков окон: {self.restarts}")
+                print_latency("восстановление окна", self.recoveries)
+            for conn in self.windows:
+                try:
+                    CODEC.send(conn, protocol.QUIT)
+                except Exception:
+                    pass
+            for display, proc in self.windows.values():
+                proc.join(timeout=1)
+        self.close()
+
+    def close(self):
+        self.metrics_block.close()
+        if self.session is not None:
+            self.session.close()
+        self.state.close()
+
+if __name__ == "__main__":
+    asyncio.run(Coordinator(process_started_at(), "--single" in sys.argv).run())
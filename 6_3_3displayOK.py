@@ -6,6 +6,8 @@ import os
 import subprocess
 import time
 
+import geometry
+
 # -------------------- Настройки расположения окон (подгоняй при необходимости) --------------------
 # Позиции в формате "X,Y" для SDL_VIDEO_WINDOW_POS — меняй в зависимости от расположения мониторов.
 # Пример: DSI — (0,0) fullscreen, HDMI1 может быть справа (например 800,0), HDMI2 правее HDMI1.
@@ -32,39 +34,9 @@ NATURAL_COLORS = {f: FIGURE_DEFS[f][0] for f in FIGURE_ORDER}
 # ----------------------------------------------------------
 #                 ФУНКЦИИ РИСОВАНИЯ
 # ----------------------------------------------------------
-def draw_circle(screen, x, y, color):
-    pygame.draw.circle(screen, color, (x, y), 160)
-
-def draw_square(screen, x, y, color):
-    pygame.draw.rect(screen, color, (x - 160, y - 160, 320, 320))
-
-def draw_triangle(screen, x, y, color):
-    points = [(x, y-200), (x-180, y+160), (x+180, y+160)]
-    pygame.draw.polygon(screen, color, points)
-
-def draw_hexagon(screen, x, y, color):
-    r = 180
-    points = [
-        (x + r, y),
-        (x + r/2, y + int(r*0.87)),
-        (x - r/2, y + int(r*0.87)),
-        (x - r, y),
-        (x - r/2, y - int(r*0.87)),
-        (x + r/2, y - int(r*0.87))
-    ]
-    pygame.draw.polygon(screen, color, points)
-
-def draw_cross(screen, x, y, color):
-    pygame.draw.rect(screen, color, (x - 50, y - 160, 100, 320))
-    pygame.draw.rect(screen, color, (x - 160, y - 50, 320, 100))
-
-DRAW_FUNCS = {
-    "circle": draw_circle,
-    "square": draw_square,
-    "triangle": draw_triangle,
-    "hexagon": draw_hexagon,
-    "cross": draw_cross
-}
+# фигуры описаны один раз в geometry.py; здесь рисуются
+# в квадрат FIGURE_BOX x FIGURE_BOX вокруг центра
+FIGURE_BOX = 400
 
 
 # ----------------------------------------------------------
@@ -109,9 +81,8 @@ def hdmi_window(conn, pos):
         screen.fill((255, 255, 255))
 
         for i, (shape, color) in enumerate(figures):
-            func = DRAW_FUNCS[shape]
             x = HDMI_SIZE[0] // 3 - 50 if i == 0 else 2 * HDMI_SIZE[0] // 3 + 50
-            func(screen, x, 300, color)
+            geometry.draw(screen, shape, (x, 300), color, FIGURE_BOX)
 
         # проверяем, не пришло ли обновление
         if conn.poll():
@@ -187,8 +158,7 @@ def dsi_window(conn):
         screen.fill((255, 255, 255))
 
         # рисуем правильную фигуру
-        func = DRAW_FUNCS[correct[0]]
-        func(screen, screen.get_width() // 2, 220, correct[1])
+        geometry.draw(screen, correct[0], (screen.get_width() // 2, 220), correct[1], FIGURE_BOX)
 
         # невидимая зона обновления (ничего не рисуем)
         # кнопка выключения
@@ -5,6 +5,8 @@ from multiprocessing import Process, Pipe
 import os
 import subprocess
 
+import geometry
+
 # ----------------------------------------------------------
 #  НАБОР — фигура + её родной цвет
 # ----------------------------------------------------------
@@ -23,45 +25,9 @@ NATURAL_COLORS = {f: FIGURE_DEFS[f][0] for f in FIGURE_ORDER}
 # ----------------------------------------------------------
 #                 ФУНКЦИИ РИСОВАНИЯ
 # ----------------------------------------------------------
-def draw_circle(screen, x, y, color):
-    pygame.draw.circle(screen, color, (x, y), 160)
-
-def draw_square(screen, x, y, color):
-#    pygame.draw.rect(screen, color, (x - 80, y - 80, 160, 160))
-    pygame.draw.rect(screen, color, (x - 160, y - 160, 320, 320))
-
-def draw_triangle(screen, x, y, color):
-#    points = [(x, y-100), (x-90, y+80), (x+90, y+80)]
-    points = [(x, y-200), (x-180, y+160), (x+180, y+160)]
-    pygame.draw.polygon(screen, color, points)
-
-def draw_hexagon(screen, x, y, color):
-#    r = 90
-    r = 180
-    points = [
-        (x + r, y),
-        (x + r/2, y + int(r*0.87)),
-        (x - r/2, y + int(r*0.87)),
-        (x - r, y),
-        (x - r/2, y - int(r*0.87)),
-        (x + r/2, y - int(r*0.87))
-    ]
-    pygame.draw.polygon(screen, color, points)
-
-def draw_cross(screen, x, y, color):
-#    pygame.draw.rect(screen, color, (x - 25, y - 120, 50, 240))
-    pygame.draw.rect(screen, color, (x - 50, y - 160, 100, 320))
-#    pygame.draw.rect(screen, color, (x - 120, y - 25, 240, 50))
-    pygame.draw.rect(screen, color, (x - 160, y - 50, 320, 100))
-
-
-DRAW_FUNCS = {
-    "circle": draw_circle,
-    "square": draw_square,
-    "triangle": draw_triangle,
-    "hexagon": draw_hexagon,
-    "cross": draw_cross
-}
+# фигуры описаны один раз в geometry.py; здесь рисуются
+# в квадрат FIGURE_BOX x FIGURE_BOX вокруг центра
+FIGURE_BOX = 400
 
 
 # ----------------------------------------------------------
@@ -101,10 +67,9 @@ def hdmi_window(pipe):
         screen.fill((255, 255, 255))
 
         for i, (shape, color) in enumerate(figures):
-            func = DRAW_FUNCS[shape]
  #           x = 1024 // 3 if i == 0 else 2 * 1024 // 3
             x = 1024 // 3 - 50 if i == 0 else 2 * 1024 // 3 + 50
-            func(screen, x, 300, color)
+            geometry.draw(screen, shape, (x, 300), color, FIGURE_BOX)
 
         if pipe.poll():
             cmd = pipe.recv()
@@ -180,8 +145,7 @@ def dsi_window(pipe):
         screen.fill((255, 255, 255))
 
         # ----- правильная фигура -----
-        func = DRAW_FUNCS[correct[0]]
-        func(screen, screen.get_width()//2, 220, correct[1])
+        geometry.draw(screen, correct[0], (screen.get_width()//2, 220), correct[1], FIGURE_BOX)
 
         # ----- кнопка ОБНОВИТЬ -----
 #       pygame.draw.rect(screen, (220, 220, 220), button_rect)
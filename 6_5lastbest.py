@@ -2,10 +2,15 @@ import pygame
 import random
 import sys
 from multiprocessing import Process, Pipe
+from multiprocessing.connection import wait
 import os
 import subprocess
 import time
 
+import geometry
+import protocol
+from pipe_waker import PipeWaker
+
 # -------------------- Настройки расположения окон (подгоняй при необходимости) --------------------
 # Позиции в формате "X,Y" для SDL_VIDEO_WINDOW_POS — меняй в зависимости от расположения мониторов.
 # Пример: DSI — (0,0) fullscreen, HDMI1 может быть справа (например 800,0), HDMI2 правее HDMI1.
@@ -28,43 +33,15 @@ FIGURE_DEFS = {
 FIGURE_ORDER = list(FIGURE_DEFS.keys())
 NATURAL_COLORS = {f: FIGURE_DEFS[f][0] for f in FIGURE_ORDER}
 
+# по pipe — двоичные кадры protocol.py: main шлёт FIGURES и QUIT, DSI — REFRESH
+CODEC = protocol.Codec(FIGURE_ORDER, [NATURAL_COLORS[f] for f in FIGURE_ORDER])
+
 
 # ----------------------------------------------------------
 #                 ФУНКЦИИ РИСОВАНИЯ
 # ----------------------------------------------------------
-def draw_circle(screen, x, y, color):
-    pygame.draw.circle(screen, color, (x, y), 160)
-
-def draw_square(screen, x, y, color):
-    pygame.draw.rect(screen, color, (x - 160, y - 160, 320, 320))
-
-def draw_triangle(screen, x, y, color):
-    points = [(x, y-200), (x-180, y+160), (x+180, y+160)]
-    pygame.draw.polygon(screen, color, points)
-
-def draw_hexagon(screen, x, y, color):
-    r = 180
-    points = [
-        (x + r, y),
-        (x + r/2, y + int(r*0.87)),
-        (x - r/2, y + int(r*0.87)),
-        (x - r, y),
-        (x - r/2, y - int(r*0.87)),
-        (x + r/2, y - int(r*0.87))
-    ]
-    pygame.draw.polygon(screen, color, points)
-
-def draw_cross(screen, x, y, color):
-    pygame.draw.rect(screen, color, (x - 50, y - 160, 100, 320))
-    pygame.draw.rect(screen, color, (x - 160, y - 50, 320, 100))
-
-DRAW_FUNCS = {
-    "circle": draw_circle,
-    "square": draw_square,
-    "triangle": draw_triangle,
-    "hexagon": draw_hexagon,
-    "cross": draw_cross
-}
+# фигуры описаны один раз в geometry.py (нормированные координаты),
+# размер и место — от размера экрана (mirror_layout / controller_layout)
 
 
 # ----------------------------------------------------------
@@ -89,7 +66,7 @@ def generate_two_wrong():
 
 # ----------------------------------------------------------
 #                 HDMI процесс (одинаков для HDMI1 и HDMI2)
-#                  принимает figures через conn.recv() и ждёт обновлений
+#                  принимает figures через pipe (кадры FIGURES) и ждёт обновлений
 # ----------------------------------------------------------
 def hdmi_window(conn, pos):
     # pos — строка "X,Y" для позиционирования окна
@@ -97,40 +74,55 @@ def hdmi_window(conn, pos):
     pygame.init()
     screen = pygame.display.set_mode(HDMI_SIZE, pygame.NOFRAME)
     pygame.display.set_caption("HDMI (mirror)")
+    # размер и центры фигур — от размера экрана
+    box, centers = geometry.mirror_layout(screen.get_size())
 
     # сначала получаем фигуры от main
     try:
-        figures = conn.recv()
+        figures = CODEC.recv(conn).figures or generate_two_wrong()
     except EOFError:
         figures = generate_two_wrong()
 
+    # кадр рисуется только когда пришли новые фигуры (или окно перекрыли),
+    # в остальное время процесс спит в event.wait — его будит событие SDL
+    # или сообщение от main (WAKE_EVENT из PipeWaker)
+    waker = PipeWaker([conn])
+    # из фигур, скопившихся пока окно рисовало, разбираются только последние
+    mailbox = protocol.Mailbox(CODEC, conn)
+    clock = pygame.time.Clock()
+    dirty = True
     running = True
     while running:
-        screen.fill((255, 255, 255))
-
-        for i, (shape, color) in enumerate(figures):
-            func = DRAW_FUNCS[shape]
-            x = HDMI_SIZE[0] // 3 - 50 if i == 0 else 2 * HDMI_SIZE[0] // 3 + 50
-            func(screen, x, 300, color)
-
         # проверяем, не пришло ли обновление
-        if conn.poll():
-            msg = conn.recv()
-            # ожидаем список фигур
-            if isinstance(msg, list):
-                figures = msg
+        for msg in mailbox.drain():
+            # ожидаем фигуры
+            if msg.kind == protocol.FIGURES:
+                figures = msg.figures
+                dirty = True
             # можно поддерживать другие команды при необходимости
-            elif msg == "quit":
+            elif msg.kind == protocol.QUIT:
                 running = False
-
-        for event in pygame.event.get():
+        if mailbox.closed:
+            running = False  # main завершился
+        waker.rearm()
+
+        if dirty:
+            screen.fill((255, 255, 255))
+            for (shape, color), center in zip(figures, centers):
+                geometry.draw(screen, shape, center, color, box)
+            pygame.display.flip()
+            dirty = False
+            clock.tick(60)  # не чаще 60 кадров/с
+        if not running:
+            break
+
+        for event in [pygame.event.wait()] + pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
             if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
                 running = False
-
-        pygame.display.flip()
-        pygame.time.delay(10)
+            if event.type == pygame.VIDEOEXPOSE:
+                dirty = True
 
     pygame.quit()
     sys.exit()
@@ -138,7 +130,7 @@ def hdmi_window(conn, pos):
 
 # ----------------------------------------------------------
 #            DSI процесс  (кнопка + правильная фигура)
-#            посылает запросы "refresh" в main через conn
+#            посылает запросы REFRESH в main через conn
 # ----------------------------------------------------------
 def dsi_window(conn):
     os.environ['SDL_VIDEO_WINDOW_POS'] = "0,0"
@@ -163,10 +155,12 @@ def dsi_window(conn):
 
     # кнопка выключения
     shutdown_rect = pygame.Rect(20, 20, 110, 40)
+    # размер и центр правильной фигуры — от размера экрана
+    box, figure_center = geometry.controller_layout(screen.get_size())
 
     # получаем начальные фигуры от main
     try:
-        figures = conn.recv()
+        figures = CODEC.recv(conn).figures or generate_two_wrong()
     except EOFError:
         figures = generate_two_wrong()
 
@@ -187,41 +181,42 @@ def dsi_window(conn):
 
     correct = compute_correct(figures)
 
+    # как и HDMI, рисуем только при изменениях: правильная фигура,
+    # температура или перекрытое окно. Между ними спим в event.wait
+    # до события, сообщения от main или следующего замера температуры
+    waker = PipeWaker([conn])
+    # pipe от main читается только через mailbox (последние фигуры и QUIT)
+    mailbox = protocol.Mailbox(CODEC, conn)
+    clock = pygame.time.Clock()
+    drawn = None  # (фигура, температура) на экране сейчас
+    events = []
     running = True
     while running:
-        screen.fill((255, 255, 255))
-
-        # рисуем правильную фигуру
-        func = DRAW_FUNCS[correct[0]]
-        func(screen, screen.get_width() // 2, 220, correct[1])
-
-        # невидимая зона обновления (ничего не рисуем)
-        # кнопка выключения
-        pygame.draw.rect(screen, (255, 0, 0), shutdown_rect)
-        pygame.draw.rect(screen, (0, 0, 0), shutdown_rect, 3)
-        screen.blit(pygame.font.SysFont(None, 24).render("SHUTDOWN", True, (255, 255, 255)),
-                    (shutdown_rect.x + 5, shutdown_rect.y + 15))
-
-        for event in pygame.event.get():
+        for event in events:
             if event.type == pygame.QUIT:
                 running = False
 
             if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
                 running = False
 
+            if event.type == pygame.VIDEOEXPOSE:
+                drawn = None
+
             if event.type == pygame.MOUSEBUTTONDOWN:
                 # ОБНОВИТЬ — нажали в невидимой зоне
                 if button_rect.collidepoint(event.pos):
                     # шлём запрос в main — main сгенерирует новые фигуры и пошлёт обратно
-                    conn.send("refresh")
+                    CODEC.send(conn, protocol.REFRESH, t0=time.monotonic())
 
                     # ждём ответ (новые фигуры) от main
-                    # (main в ответ пришлёт тот же объект figures для DSI)
+                    # (main в ответ пришлёт те же figures, что и HDMI)
                     if conn.poll(timeout=5):
-                        msg = conn.recv()
-                        if isinstance(msg, list):
-                            figures = msg
-                            correct = compute_correct(figures)
+                        for msg in mailbox.drain():
+                            if msg.kind == protocol.FIGURES:
+                                figures = msg.figures
+                                correct = compute_correct(figures)
+                            elif msg.kind == protocol.QUIT:
+                                running = False
                     else:
                         # таймаут — ничего не делаем
                         pass
@@ -243,13 +238,43 @@ def dsi_window(conn):
 
             next_temp_time = time.time() + 5  # обновление раз в 5 сек
 
-# вывод температуры в правом верхнем углу
-        text_surface = cpu_font.render(cpu_temp, True, (0, 0, 0))
-        screen.blit(text_surface, (screen.get_width() - text_surface.get_width() - 20, 20))
+        # сообщения от main вне refresh: опоздавший ответ или QUIT
+        for msg in mailbox.drain():
+            if msg.kind == protocol.FIGURES:
+                figures = msg.figures
+                correct = compute_correct(figures)
+            elif msg.kind == protocol.QUIT:
+                running = False
+        if mailbox.closed:
+            running = False  # main завершился
+        waker.rearm()
+
+        if (correct, cpu_temp) != drawn:
+            drawn = (correct, cpu_temp)
+            screen.fill((255, 255, 255))
+
+            # рисуем правильную фигуру
+            geometry.draw(screen, correct[0], figure_center, correct[1], box)
+
+            # невидимая зона обновления (ничего не рисуем)
+            # кнопка выключения
+            pygame.draw.rect(screen, (255, 0, 0), shutdown_rect)
+            pygame.draw.rect(screen, (0, 0, 0), shutdown_rect, 3)
+            screen.blit(pygame.font.SysFont(None, 24).render("SHUTDOWN", True, (255, 255, 255)),
+                        (shutdown_rect.x + 5, shutdown_rect.y + 15))
+
+            # вывод температуры в правом верхнем углу
+            text_surface = cpu_font.render(cpu_temp, True, (0, 0, 0))
+            screen.blit(text_surface, (screen.get_width() - text_surface.get_width() - 20, 20))
 
+            pygame.display.flip()
+            clock.tick(60)  # не чаще 60 кадров/с
+        if not running:
+            break
 
-        pygame.display.flip()
-        pygame.time.delay(10)
+        # 0 в event.wait — ждать без срока, поэтому не меньше 1 мс
+        timeout = max(1, int((next_temp_time - time.time()) * 1000))
+        events = [pygame.event.wait(timeout)] + pygame.event.get()
 
     pygame.quit()
     sys.exit()
@@ -271,44 +296,59 @@ if __name__ == "__main__":
     p_hdmi2 = Process(target=hdmi_window, args=(h2_child, HDMI2_POS), daemon=True)
     p_dsi = Process(target=dsi_window, args=(dsi_child,), daemon=True)
 
-    # стартуем процессы
+    # стартуем процессы; "детские" концы у main закрываем сразу после
+    # старта — иначе pipe не даст EOF, когда окно завершится
     p_hdmi1.start()
+    h1_child.close()
     p_hdmi2.start()
+    h2_child.close()
     p_dsi.start()
+    dsi_child.close()
 
     # main генерирует начальные фигуры и рассылает всем трём
     figures = generate_two_wrong()
-    # отправляем список фигур (двух неправильных) hdmi1, hdmi2 и DSI
-    main_h1_parent.send(figures)
-    main_h2_parent.send(figures)
-    main_dsi_parent.send(figures)
+    # отправляем фигуры (две неправильные) hdmi1, hdmi2 и DSI —
+    # кадр кодируется один раз на всех
+    frame = CODEC.encode(protocol.FIGURES, figures=figures)
+    main_h1_parent.send_bytes(frame)
+    main_h2_parent.send_bytes(frame)
+    main_dsi_parent.send_bytes(frame)
 
     try:
         # основной цикл: ждём команд от DSI (refresh)
-        while True:
-            # проверяем, не пришёл ли запрос от DSI
-            if main_dsi_parent.poll():
-                msg = main_dsi_parent.recv()
-                if msg == "refresh":
-                    # сгенерировать новые фигуры и разослать их всем трём
+        conns = [main_dsi_parent, main_h1_parent, main_h2_parent]
+        while conns:
+            # блокируемся на всех pipe сразу — процесс спит, пока никто не пишет
+            for conn in wait(conns):
+                try:
+                    msg = CODEC.recv(conn)
+                except EOFError:
+                    conns.remove(conn)
+                    continue
+                except protocol.ProtocolError as e:
+                    print("неверное сообщение:", e)
+                    continue
+                if conn is main_dsi_parent and msg.kind == protocol.REFRESH:
+                    # сгенерировать новые фигуры и разослать их всем живым окнам
                     figures = generate_two_wrong()
-                    main_h1_parent.send(figures)
-                    main_h2_parent.send(figures)
-                    main_dsi_parent.send(figures)
-            # небольшой sleep, чтобы цикл не грузил CPU
-            time.sleep(0.05)
+                    frame = CODEC.encode(protocol.FIGURES, figures=figures)
+                    for window in conns:
+                        try:
+                            window.send_bytes(frame)
+                        except (BrokenPipeError, ConnectionResetError):
+                            pass  # окно уже завершилось — его EOF уберёт его из conns
     except KeyboardInterrupt:
         # корректный выход при ctrl+c, остановим процессы
         try:
-            main_h1_parent.send("quit")
+            main_h1_parent.send_bytes(CODEC.encode(protocol.QUIT))
         except Exception:
             pass
         try:
-            main_h2_parent.send("quit")
+            main_h2_parent.send_bytes(CODEC.encode(protocol.QUIT))
         except Exception:
             pass
         try:
-            main_dsi_parent.send("quit")
+            main_dsi_parent.send_bytes(CODEC.encode(protocol.QUIT))
         except Exception:
             pass
 
@@ -2,6 +2,9 @@ import pygame
 import random
 import sys
 
+import geometry
+from render_cache import FigureAtlas
+
 pygame.init()
 
 # Окно
@@ -19,42 +22,15 @@ WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 COLORS = [(255, 0, 0), (0, 128, 255), (0, 200, 0), (255, 165, 0), (200, 0, 200)]
 
-# --- Функции рисования фигур ---
-def draw_circle(x, y, color):
-    pygame.draw.circle(screen, color, (x, y), 50)
-
-def draw_square(x, y, color):
-    pygame.draw.rect(screen, color, (x-50, y-50, 100, 100))
-
-def draw_triangle(x, y, color):
-    points = [(x, y-60), (x-55, y+40), (x+55, y+40)]
-    pygame.draw.polygon(screen, color, points)
-
-def draw_hexagon(x, y, color):
-    r = 50
-    points = [
-        (x + r, y),
-        (x + r/2, y + int(r*0.87)),
-        (x - r/2, y + int(r*0.87)),
-        (x - r, y),
-        (x - r/2, y - int(r*0.87)),
-        (x + r/2, y - int(r*0.87))
-    ]
-    pygame.draw.polygon(screen, color, points)
-
-def draw_cross(x, y, color):
-    pygame.draw.rect(screen, color, (x - 15, y - 60, 30, 120))
-    pygame.draw.rect(screen, color, (x - 60, y - 15, 120, 30))
-
-
-# Все фигуры
-shapes = [
-    draw_circle,
-    draw_square,
-    draw_triangle,
-    draw_hexagon,
-    draw_cross
-]
+# --- Фигуры ---
+# фигуры описаны один раз в geometry.py; здесь рисуются
+# в квадрат FIGURE_BOX x FIGURE_BOX вокруг центра
+FIGURE_BOX = 125
+shapes = list(geometry.SHAPES)
+
+# фигуры рисуются один раз в атлас
+atlas = FigureAtlas(geometry.SHAPES, geometry.draw)
+atlas.warm(COLORS, [FIGURE_BOX])
 
 # --- Кнопка ---
 button_rect = pygame.Rect(WIDTH//2 - 100, HEIGHT - 80, 200, 50)
@@ -79,31 +55,40 @@ def get_new_objects():
 current_shapes, current_colors = get_new_objects()
 
 # --- Главный цикл ---
+# кадр рисуется только после нажатия кнопки (или когда окно перекрыли),
+# остальное время процесс спит в event.wait и не грузит ядро
+clock = pygame.time.Clock()
+dirty = True
 running = True
 while running:
-    screen.fill(WHITE)
+    if dirty:
+        screen.fill(WHITE)
+
+        # Рисуем фигуры со СТАБИЛЬНЫМИ цветами
+        atlas.blit(screen, current_shapes[0], current_colors[0], (WIDTH//3, HEIGHT//2 - 50), FIGURE_BOX)
+        atlas.blit(screen, current_shapes[1], current_colors[1], (2*WIDTH//3, HEIGHT//2 - 50), FIGURE_BOX)
 
-    # Рисуем фигуры со СТАБИЛЬНЫМИ цветами
-    current_shapes[0](WIDTH//3, HEIGHT//2 - 50, current_colors[0])
-    current_shapes[1](2*WIDTH//3, HEIGHT//2 - 50, current_colors[1])
+        # Кнопка
+        draw_button()
 
-    # Кнопка
-    draw_button()
+        pygame.display.flip()
+        dirty = False
+        clock.tick(60)  # не чаще 60 кадров/с
 
     # События
-    for event in pygame.event.get():
+    for event in [pygame.event.wait()] + pygame.event.get():
         if event.type == pygame.QUIT:
             running = False
         if event.type == pygame.KEYDOWN:
             if event.key == pygame.K_ESCAPE:
                 running = False
+        if event.type == pygame.VIDEOEXPOSE:
+            dirty = True
         
         if event.type == pygame.MOUSEBUTTONDOWN:
             if button_rect.collidepoint(event.pos):
                 current_shapes, current_colors = get_new_objects()
-
-    pygame.display.flip()
+                dirty = True
 
 pygame.quit()
 sys.exit()
-
@@ -0,0 +1,156 @@
+import collections
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from bench_modes import cpu_seconds, headless_env, process_tree
+
+# ----------------------------------------------------------
+#   НАГРУЗКА НА УПРАВЛЯЮЩИЙ СОКЕТ: запускает 6LAST.py целиком без
+#   экранов (SDL dummy) и шлёт команды оператора:
+#     по одной — следующая после ответа на предыдущую (задержка
+#     команды туда-обратно);
+#     потоком — до WINDOW команд без ответа, смесь round N / mode /
+#     state / metrics (сколько команд в секунду выдерживает main).
+#   Затем проверяет через state, что применилась последняя команда
+#   и окна живы, и печатает из metrics время применения команды
+#   в main, сколько WAKE окна отбросили без разбора и CPU процессов.
+#
+#   python bench_control.py [секунд потока]
+# ----------------------------------------------------------
+HERE = os.path.dirname(os.path.abspath(__file__))
+SOCKET = "/tmp/figures-control.sock"  # CONTROL_SOCKET в 6LAST.py
+WINDOW = 256  # команд в полёте в потоке
+
+
+class Client:
+    def __init__(self, path):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path)
+        self.reader = self.sock.makefile("rb")
+
+    def send(self, line):
+        self.sock.sendall(line.encode() + b"\n")
+
+    def reply(self):
+        # ответ одной команды; у metrics — вместе с текстом
+        line = self.reader.readline().decode()
+        if line.startswith("ok ") and line[3:].strip().isdigit():
+            return line + self.reader.read(int(line[3:])).decode()
+        return line
+
+    def call(self, line):
+        self.send(line)
+        return self.reply()
+
+
+def percentiles(ms):
+    ms = sorted(ms)
+    return (f"p50 {ms[len(ms) // 2]:.3f} мс, p99 {ms[int(len(ms) * 0.99)]:.3f} мс, "
+            f"макс {ms[-1]:.3f} мс")
+
+
+def metric(text, name, labels='process="main"'):
+    # значение из текста Prometheus, 0 — если строки нет
+    match = re.search(rf"^figures_{name}{{{re.escape(labels)}}} (\S+)$", text, re.M)
+    return float(match.group(1)) if match else 0.0
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    sessions = tempfile.TemporaryDirectory()
+    proc = subprocess.Popen([sys.executable, "-W", "ignore", os.path.join(HERE, "6LAST.py")],
+                            cwd=HERE, env=headless_env(sessions.name), stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL, start_new_session=True)
+    try:
+        time.sleep(3)  # старт и первые кадры
+        client = Client(SOCKET)
+        assert client.call("mode game").startswith("ok")
+        tree = process_tree(proc.pid)
+        cpu_start = {pid: cpu_seconds(pid) for pid in tree}
+
+        # по одной
+        rtt = []
+        for i in range(2000):
+            command = "state" if i % 4 == 3 else f"round {i + 2}"
+            t = time.perf_counter()
+            reply = client.call(command)
+            rtt.append((time.perf_counter() - t) * 1000)
+            assert reply.startswith("ok"), reply
+        print(f"по одной:  {len(rtt)} команд, туда-обратно {percentiles(rtt)}")
+
+        # потоком: отдельный поток читает ответы, этот шлёт, пока в полёте < WINDOW
+        sent = collections.deque()  # моменты отправки команд без ответа
+        latencies = []
+        slots = threading.Semaphore(WINDOW)
+        errors = []
+
+        def read_replies(count):
+            for _ in range(count):
+                reply = client.reply()
+                latencies.append((time.perf_counter() - sent.popleft()) * 1000)
+                slots.release()
+                if not reply.startswith("ok"):
+                    errors.append(reply)
+
+        commands = []
+        started = time.perf_counter()
+        round_id = 10000
+        while time.perf_counter() - started < seconds:
+            for i in range(1000):
+                if i % 100 == 50:
+                    commands.append("mode splash" if i % 200 else "mode game")
+                elif i % 10 == 5:
+                    commands.append("state")
+                elif i == 999:
+                    commands.append("metrics")
+                else:
+                    round_id += 1
+                    commands.append(f"round {round_id}")
+            reader = threading.Thread(target=read_replies, args=(1000,))
+            reader.start()
+            for command in commands[-1000:]:
+                slots.acquire()
+                sent.append(time.perf_counter())
+                client.send(command)
+            reader.join()
+        flood = time.perf_counter() - started
+        cpu = {pid: cpu_seconds(pid) - cpu_start[pid] for pid in tree}
+        print(f"потоком:   {len(commands)} команд за {flood:.1f} с = "
+              f"{len(commands) / flood:.0f} в секунду, "
+              f"ответ {percentiles(latencies)}")
+        assert not errors, errors[:3]
+
+        # итог: последняя команда применилась, окна живы и не перезапускались
+        client.call("mode game")
+        state = client.call("state")
+        print(f"состояние: {state.strip()}")
+        assert f"round={round_id} " in state and "windows=DSI,HDMI1,HDMI2 " in state \
+            and "restarts=0" in state, state
+        time.sleep(0.2)
+        text = client.call("metrics")
+        count = metric(text, "control_command_seconds_count")
+        fast = metric(text, "control_command_seconds_bucket", 'process="main",le="0.001"')
+        total = metric(text, "control_command_seconds_sum")
+        print(f"применение в main: {count:.0f} команд, в среднем {total / count * 1e6:.0f} мкс, "
+              f"до 1 мс — {fast / count * 100:.1f}%")
+        conflated = [(name, metric(text, "pipe_conflated", f'process="{name}"'))
+                     for name in ("DSI", "HDMI1", "HDMI2")]
+        print("WAKE отброшено окнами без разбора: "
+              + ", ".join(f"{name} {value:.0f}" for name, value in conflated))
+        print(f"CPU за нагрузку: main {cpu[proc.pid] / flood * 100:.0f}%, окна "
+              f"{sum(v for pid, v in cpu.items() if pid != proc.pid) / flood * 100:.0f}%")
+    finally:
+        os.killpg(proc.pid, signal.SIGKILL)
+        proc.wait()
+        sessions.cleanup()
+
+
+if __name__ == "__main__":
+    main()
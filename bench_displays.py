@@ -0,0 +1,143 @@
+import importlib.util
+import multiprocessing
+import os
+import sys
+import time
+
+from bench_modes import cpu_seconds
+
+# ----------------------------------------------------------
+#   БЕНЧМАРК ТОПОЛОГИИ: 1..16 HDMI-зеркал без реальных экранов
+#   (SDL dummy). Для каждого числа зеркал main публикует раунды,
+#   окна сообщают момент, когда раунд реально ушёл на экран.
+#   Печатает задержку рассылки (публикация -> update/flip; с
+#   PRESENT_LEAD скрипта в неё входит и назначенный запас), разброс
+#   смены раунда между зеркалами и суммарный CPU всех окон в
+#   процентах одного ядра.
+#
+#   python bench_displays.py [скрипт] [раундов]
+# ----------------------------------------------------------
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# окна бенчмарков получают модуль скрипта из load_script — его не передать
+# в spawn/forkserver, поэтому процессы всегда через fork (как в 6LAST.py)
+FORK = multiprocessing.get_context("fork")
+
+
+def load_script(path):
+    # имена вроде 6LAST.py не импортируются обычным import
+    name = os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(f"script_{name}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def mirror(game, conn, state, display, presented):
+    # подменяем update/flip, чтобы узнать, когда раунд дошёл до экрана
+    import pygame
+    update, flip = pygame.display.update, pygame.display.flip
+
+    def report():
+        presented.put((display.name, state.read().round_id, time.monotonic()))
+
+    def patched_update(*args):
+        update(*args)
+        report()
+
+    def patched_flip():
+        flip()
+        report()
+
+    pygame.display.update = patched_update
+    pygame.display.flip = patched_flip
+    game.hdmi_window(conn, state, display)
+
+
+def run(game, n_mirrors, rounds):
+    state = game.RoundState(game.FIGURE_ORDER,
+                            [game.NATURAL_COLORS[f] for f in game.FIGURE_ORDER])
+    deck = game.RoundDeck(game.ROUNDS, 1)
+
+    def publish(round_id):
+        # как publish_round в main: с фигурами следующих раундов
+        upcoming = [deck[round_id + i].figures for i in range(1, game.UPCOMING + 1)]
+        lead = getattr(game, "PRESENT_LEAD", None)
+        state.publish("game", round_id, deck[round_id].figures, upcoming=upcoming,
+                      present_at=time.monotonic() + lead if lead else 0.0)
+
+    publish(0)
+    presented = FORK.Queue()
+    windows = []
+    for i in range(n_mirrors):
+        display = game.Display(f"HDMI{i + 1}", "mirror", "0,0", game.HDMI_SIZE)
+        parent, child = FORK.Pipe()
+        proc = FORK.Process(target=mirror, args=(game, child, state, display, presented), daemon=True)
+        proc.start()
+        windows.append((parent, proc))
+
+    # ждём первый кадр от всех окон
+    ready = set()
+    while len(ready) < n_mirrors:
+        ready.add(presented.get(timeout=30)[0])
+    time.sleep(0.5)
+    while not presented.empty():
+        presented.get()
+
+    cpu_start = sum(cpu_seconds(p.pid) for _, p in windows)
+    wall_start = time.monotonic()
+    published = {}
+    for round_id in range(1, rounds + 1):
+        published[round_id] = time.monotonic()
+        publish(round_id)
+        for parent, _ in windows:
+            game.CODEC.send(parent, game.protocol.WAKE)
+        time.sleep(0.1)
+    time.sleep(0.2)
+    cpu = sum(cpu_seconds(p.pid) for _, p in windows) - cpu_start
+    wall = time.monotonic() - wall_start
+
+    # первый показ каждого раунда в каждом окне
+    first_shown = {}
+    while not presented.empty():
+        name, round_id, t = presented.get()
+        if round_id in published:
+            first_shown.setdefault((name, round_id), t)
+
+    for parent, proc in windows:
+        game.CODEC.send(parent, game.protocol.QUIT)
+    for parent, proc in windows:
+        proc.join(timeout=5)
+    state.close()
+
+    ms = sorted((t - published[round_id]) * 1000
+                for (_, round_id), t in first_shown.items())
+    # разброс: последнее зеркало - первое, по раундам, что показали все
+    shown = {}
+    for (_, round_id), t in first_shown.items():
+        shown.setdefault(round_id, []).append(t)
+    skew = sorted((max(ts) - min(ts)) * 1000 for ts in shown.values() if len(ts) == n_mirrors)
+    return ms, skew, cpu / wall * 100
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(HERE, "6LAST.py")
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    game = load_script(path)
+    print(f"{os.path.basename(path)}: {rounds} раундов")
+    print(" зеркал  медиана мс   p95 мс   макс мс   разброс p50/p95 мс   CPU %")
+    for n in (1, 2, 4, 8, 16):
+        ms, skew, cpu = run(game, n, rounds)
+        if not ms:
+            print(f"{n:7d}  нет данных")
+            continue
+        skew = skew or [0.0]
+        print(f"{n:7d} {ms[len(ms) // 2]:10.2f} {ms[int(len(ms) * 0.95)]:8.2f} "
+              f"{ms[-1]:9.2f}   {skew[len(skew) // 2]:7.2f} {skew[int(len(skew) * 0.95)]:7.2f}"
+              f"    {cpu:7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import os
+import sys
+import time
+
+from bench_displays import FORK, HERE, load_script, mirror
+from bench_modes import cpu_seconds
+
+# ----------------------------------------------------------
+#   ПОТОК СООБЩЕНИЙ В МЕДЛЕННОЕ ОКНО: одно HDMI-окно (SDL dummy),
+#   каждый вывод кадра которого дополнительно стоит FLIP_MS (как
+#   smoothscale или медленный flip на Pi). main публикует раунды
+#   и будит окно без пауз, пока окно занято — в pipe копятся WAKE.
+#   Печатает, сколько кадров пришло в окно и сколько из них замещено
+#   без разбора (protocol.Mailbox), сколько кадров показано, CPU окна
+#   и проверяет, что на экране в итоге последний раунд.
+#
+#   python bench_flood.py [секунд] [FLIP_MS]
+# ----------------------------------------------------------
+
+
+def slow_mirror(game, conn, state, display, presented, block, flip_ms):
+    import pygame
+    update = pygame.display.update
+
+    def slow_update(*args):
+        time.sleep(flip_ms / 1000)
+        update(*args)
+
+    pygame.display.update = slow_update
+    # mirror() запускает hdmi_window без общего блока метрик — подставляем свой
+    window = game.hdmi_window
+    game.hdmi_window = lambda conn, state, display: window(conn, state, display, block)
+    mirror(game, conn, state, display, presented)
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3
+    flip_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 50
+    game = load_script(os.path.join(HERE, "6LAST.py"))
+    state = game.RoundState(game.FIGURE_ORDER,
+                            [game.NATURAL_COLORS[f] for f in game.FIGURE_ORDER])
+    block = game.metrics.MetricsBlock(["HDMI1"])
+    deck = game.RoundDeck(game.ROUNDS, 1)
+
+    def publish(round_id):
+        upcoming = [deck[round_id + i].figures for i in range(1, game.UPCOMING + 1)]
+        lead = game.PRESENT_LEAD
+        state.publish("game", round_id, deck[round_id].figures, upcoming=upcoming,
+                      present_at=time.monotonic() + lead if lead else 0.0)
+
+    publish(1)  # раунды колоды — с 1
+    presented = FORK.Queue()
+    display = game.Display("HDMI1", "mirror", "0,0", game.HDMI_SIZE)
+    parent, child = FORK.Pipe()
+    proc = FORK.Process(target=slow_mirror,
+                   args=(game, child, state, display, presented, block, flip_ms), daemon=True)
+    proc.start()
+    child.close()
+    presented.get(timeout=30)  # первый кадр
+    time.sleep(0.5)
+    while not presented.empty():
+        presented.get()
+
+    cpu_start = cpu_seconds(proc.pid)
+    started = time.monotonic()
+    round_id = 1
+    while time.monotonic() - started < seconds:
+        round_id += 1
+        publish(round_id)
+        game.CODEC.send(parent, game.protocol.WAKE)
+    flood = time.monotonic() - started
+    time.sleep(0.5 + flip_ms / 1000)
+    cpu = cpu_seconds(proc.pid) - cpu_start
+
+    shown = []
+    while not presented.empty():
+        shown.append(presented.get()[1])
+    slot = block.slot("HDMI1")
+    conflated = slot.get(game.metrics.CONFLATED)
+    depth_max = slot.get(game.metrics.QUEUE_DEPTH_MAX)
+    game.CODEC.send(parent, game.protocol.QUIT)
+    proc.join(timeout=5)
+    block.close()
+    state.close()
+
+    published = round_id - 1
+    print(f"публикаций {published} за {flood:.1f} с ({published / flood:.0f}/с), "
+          f"вывод кадра +{flip_ms:.0f} мс")
+    print(f"окно: кадров из pipe замещено без разбора {conflated:.0f}, "
+          f"самая длинная очередь {depth_max:.0f}, показано кадров {len(shown)}, "
+          f"CPU {cpu / (flood + 0.5) * 100:.1f}%")
+    assert shown and shown[-1] == round_id, (shown[-1:], round_id)
+    print(f"на экране последний раунд {shown[-1]}: ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+import bisect
+import os
+import sys
+import time
+from multiprocessing.connection import wait
+
+from bench_displays import FORK, HERE, load_script
+
+# ----------------------------------------------------------
+#   БЕНЧМАРК КАДРОВ БЕЗ ЭКРАНОВ (SDL dummy)
+#   Каждый цикл окна (hdmi_window, dsi_window) гоняется фиксированное
+#   число кадров в режимах заставки и игры. Печатает:
+#     - время работы кадра (без сна в clock.tick / time.delay /
+#       event.wait), перцентили p50/p95/p99, и итоговый fps;
+#     - refresh "тап -> новый кадр" через настоящий Pipe-протокол
+#       варианта (бенчмарк играет роль main); ответы, после которых
+#       до следующего тапа нового кадра нет, считаются отдельно;
+#     - время растеризации каждой фигуры (geometry.draw) в размере варианта.
+#   Одни и те же сценарии для всех вариантов скрипта.
+#
+#   python bench_frames.py [--frames N] [скрипт.py ...]
+# ----------------------------------------------------------
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+VARIANTS = ["6_2.py", "6_3_3displayOK.py", "6_5lastbest.py", "6LAST.py"]
+TAP_EVERY = 20  # кадров между тапами в сценарии refresh
+IDLE_WAKE_MS = 16  # потолок event.wait в бенчмарке — "кадр" простоя
+
+
+# ---------------- замеры внутри процесса окна ----------------
+class Probe:
+    # подменяет функции pygame, которые цикл окна вызывает раз в кадр:
+    # event.get/event.wait — граница кадра, tick/delay/wait — сон,
+    # flip/update — кадр ушёл на экран
+    def __init__(self, frames, tap=False):
+        self.max_frames = frames
+        self.tap = tap
+        self.frames = []    # (начало, конец, сон внутри кадра)
+        self.presents = []
+        self.taps = []
+        self.slept = 0.0
+        self.started = None
+        self.waited = False  # был event.wait, следующий event.get — тот же кадр
+        self.pending = []    # события, не поместившиеся в один event.wait
+
+    def install(self):
+        probe = self
+        orig_get, orig_wait = pygame.event.get, pygame.event.wait
+        orig_flip, orig_update = pygame.display.flip, pygame.display.update
+        orig_delay, orig_clock = pygame.time.delay, pygame.time.Clock
+
+        def boundary():
+            now = time.monotonic()
+            if probe.started is not None:
+                probe.frames.append((probe.started, now, probe.slept))
+            probe.started = now
+            probe.slept = 0.0
+            return now
+
+        def extra_events(now):
+            n = len(probe.frames)
+            events = []
+            if probe.tap and n and n % TAP_EVERY == 0:
+                # тап в зоне "обновить" у всех вариантов (низ экрана по центру)
+                width, height = pygame.display.get_surface().get_size()
+                probe.taps.append(now)
+                events.append(pygame.event.Event(pygame.MOUSEBUTTONDOWN,
+                                                 pos=(width // 2, height - 80), button=1))
+            if n >= probe.max_frames:
+                events.append(pygame.event.Event(pygame.QUIT))
+            return events
+
+        def get(*args, **kwargs):
+            if probe.waited:
+                # тот же кадр: цикл добирает очередь после event.wait
+                probe.waited = False
+                extra, probe.pending = probe.pending, []
+                return orig_get(*args, **kwargs) + extra
+            now = boundary()
+            return orig_get(*args, **kwargs) + extra_events(now)
+
+        def wait_event(timeout=0):
+            now = boundary()
+            probe.waited = True
+            extra = extra_events(now)
+            if extra:
+                probe.pending = extra[1:]
+                return extra[0]
+            # циклы, которые спят до события, здесь просыпаются не реже
+            # IDLE_WAKE_MS, иначе на статичном кадре бенчмарк не кончится
+            timeout = min(timeout, IDLE_WAKE_MS) if timeout else IDLE_WAKE_MS
+            event = orig_wait(timeout)
+            probe.slept += time.monotonic() - now
+            return event
+
+        def flip():
+            orig_flip()
+            probe.presents.append(time.monotonic())
+
+        def update(*args):
+            orig_update(*args)
+            probe.presents.append(time.monotonic())
+
+        def delay(ms):
+            t = time.monotonic()
+            orig_delay(ms)
+            probe.slept += time.monotonic() - t
+
+        class Clock:
+            def __init__(self):
+                self._clock = orig_clock()
+
+            def tick(self, fps=0):
+                t = time.monotonic()
+                result = self._clock.tick(fps)
+                probe.slept += time.monotonic() - t
+                return result
+
+            def __getattr__(self, name):
+                return getattr(self._clock, name)
+
+        pygame.event.get = get
+        pygame.event.wait = wait_event
+        pygame.display.flip = flip
+        pygame.display.update = update
+        pygame.time.delay = delay
+        pygame.time.Clock = Clock
+
+
+def run_window(probe, results, target, *args):
+    probe.install()
+    try:
+        target(*args)
+    except SystemExit:
+        pass
+    finally:
+        results.put((probe.frames, probe.presents, probe.taps))
+
+
+# ---------------- адаптеры: бенчмарк играет роль main ----------------
+class Game6Last:
+    # 6LAST.py: общее состояние в shared memory, команды — кадры protocol.py
+    def __init__(self, game):
+        self.game = game
+        self.state = None
+
+    def start(self, role, mode):
+        game = self.game
+        self.state = game.RoundState(game.FIGURE_ORDER,
+                                     [game.NATURAL_COLORS[f] for f in game.FIGURE_ORDER])
+        self.round_id = 1
+        self.mode = mode
+        self.deck = game.RoundDeck(game.ROUNDS, 1)
+        self.publish()
+        if role == "hdmi":
+            display = game.Display("HDMI1", "mirror", "0,0", game.HDMI_SIZE)
+            return game.hdmi_window, (self.state, display)
+        display = game.Display("DSI", "controller", "0,0", None)
+        return game.dsi_window, (self.state, display)
+
+    def recv(self, conn):
+        return self.game.CODEC.recv(conn)
+
+    def handle(self, conn, msg):
+        # True — в ответ на refresh отправлен новый раунд
+        protocol = self.game.protocol
+        if msg.kind == protocol.REFRESH:
+            self.round_id += 1
+            self.publish(msg.req_id)
+            self.game.CODEC.send(conn, protocol.WAKE)
+            return True
+        return False
+
+    def publish(self, req_id=0):
+        # как publish_round в main: раунд из колоды и фигуры следующих
+        deck, round_id = self.deck, self.round_id
+        upcoming = [deck[round_id + i].figures for i in range(1, self.game.UPCOMING + 1)]
+        self.state.publish(self.mode, round_id, deck[round_id].figures, req_id, 0, upcoming)
+
+    def stop(self):
+        self.state.close()
+
+
+class GamePipes:
+    # 6_3_3displayOK.py: списки фигур по pipe, "refresh" строкой
+    def __init__(self, game):
+        self.game = game
+
+    def start(self, role, mode):
+        if mode == "splash":
+            return None
+        if role == "hdmi":
+            return self.game.hdmi_window, ("0,0",)
+        return self.game.dsi_window, ()
+
+    def send_first(self, conn):
+        conn.send(self.game.generate_two_wrong())
+
+    def recv(self, conn):
+        return conn.recv()
+
+    def handle(self, conn, msg):
+        if msg == "refresh":
+            conn.send(self.game.generate_two_wrong())
+            return True
+        return False
+
+    def stop(self):
+        pass
+
+
+class Game62(GamePipes):
+    # 6_2.py: HDMI и DSI связаны одной трубой, HDMI сам генерирует фигуры
+    def start(self, role, mode):
+        if mode == "splash":
+            return None
+        if role == "hdmi":
+            return self.game.hdmi_window, ()
+        return self.game.dsi_window, ()
+
+    def send_first(self, conn):
+        if self.role != "hdmi":
+            conn.send(self.game.generate_two_wrong())
+
+
+class GameFrames(GamePipes):
+    # 6_5lastbest.py: то же, но кадрами protocol.py (FIGURES / REFRESH)
+    def send_first(self, conn):
+        self.game.CODEC.send(conn, self.game.protocol.FIGURES, figures=self.game.generate_two_wrong())
+
+    def recv(self, conn):
+        return self.game.CODEC.recv(conn)
+
+    def handle(self, conn, msg):
+        protocol = self.game.protocol
+        if msg.kind == protocol.REFRESH:
+            self.game.CODEC.send(conn, protocol.FIGURES, figures=self.game.generate_two_wrong())
+            return True
+        return False
+
+
+ADAPTERS = {"6LAST.py": Game6Last, "6_2.py": Game62, "6_5lastbest.py": GameFrames}
+
+
+def run_scenario(adapter, role, mode, frames, refresh=False):
+    adapter.role = role
+    started = adapter.start(role, mode)
+    if started is None:
+        return None
+    target, args = started
+    parent, child = FORK.Pipe()
+    results = FORK.Queue()
+    probe = Probe(frames, refresh)
+    proc = FORK.Process(target=run_window, args=(probe, results, target, child) + args, daemon=True)
+    proc.start()
+
+    if hasattr(adapter, "send_first"):
+        adapter.send_first(parent)
+
+    replies = []
+    while proc.is_alive():
+        if not wait([parent, proc.sentinel], timeout=1):
+            continue
+        while parent.poll():
+            try:
+                msg = adapter.recv(parent)
+            except EOFError:
+                break
+            received = time.monotonic()
+            if adapter.handle(parent, msg):
+                replies.append((received, time.monotonic()))
+        if not results.empty():
+            break
+    frames_log, presents, taps = results.get(timeout=30)
+    proc.join(timeout=5)
+    adapter.stop()
+
+    busy = sorted((end - start - slept) * 1000 for start, end, slept in frames_log)
+    wall = frames_log[-1][1] - frames_log[0][0] if frames_log else 0
+    fps = len(frames_log) / wall if wall else 0
+
+    # запрос — от последнего тапа до его прихода: DSI пропускает тапы, пока
+    # ждёт прошлый раунд, поэтому по порядку тапы и ответы не сопоставить
+    round_trips = []
+    unseen = 0  # ответ без нового кадра до следующего тапа (та же фигура и т.п.)
+    for received, reply in replies:
+        i = bisect.bisect_right(taps, received) - 1
+        if i < 0:
+            continue
+        next_tap = taps[i + 1] if i + 1 < len(taps) else float("inf")
+        shown = next((p for p in presents if p >= reply), None)
+        if shown is None or shown >= next_tap:
+            unseen += 1
+        else:
+            round_trips.append((shown - taps[i]) * 1000)
+    return busy, fps, sorted(round_trips), unseen
+
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def time_figures(game, reps=300):
+    # у вариантов без FIGURE_BOX размер от экрана; HDMI 1024x600 — 400
+    box = getattr(game, "FIGURE_BOX", 400)
+    surface = pygame.Surface((1024, 600))
+    result = []
+    for shape in game.geometry.SHAPES:
+        color = game.NATURAL_COLORS[shape]
+        t = time.perf_counter()
+        for _ in range(reps):
+            game.geometry.draw(surface, shape, (400, 300), color, box)
+        result.append((shape, (time.perf_counter() - t) / reps * 1e6))
+    return result
+
+
+def bench_variant(path, frames):
+    name = os.path.basename(path)
+    game = load_script(path)
+    adapter = ADAPTERS.get(name, GamePipes)(game)
+    print(f"\n=== {name} ({frames} кадров) ===")
+    print("  сценарий       p50 мс   p95 мс   p99 мс     fps")
+    for role, mode, refresh in (("hdmi", "splash", False), ("hdmi", "game", False),
+                                ("dsi", "splash", False), ("dsi", "game", False),
+                                ("dsi", "game", True)):
+        label = f"{role}/{'refresh' if refresh else mode}"
+        result = run_scenario(adapter, role, mode, frames, refresh)
+        if result is None:
+            print(f"  {label:12s}   нет режима")
+            continue
+        busy, fps, round_trips, unseen = result
+        print(f"  {label:12s} {percentile(busy, 0.5):8.2f} {percentile(busy, 0.95):8.2f} "
+              f"{percentile(busy, 0.99):8.2f} {fps:7.1f}")
+        if refresh:
+            if round_trips:
+                print(f"  тап -> кадр   p50 {percentile(round_trips, 0.5):.1f} мс, "
+                      f"p95 {percentile(round_trips, 0.95):.1f} мс (n={len(round_trips)}, "
+                      f"без нового кадра {unseen})")
+            else:
+                print(f"  тап -> кадр   нет данных (без нового кадра {unseen})")
+
+    draws = ", ".join(f"{shape} {us:.0f}" for shape, us in time_figures(game))
+    print(f"  geometry.draw, мкс/вызов: {draws}")
+
+
+def main():
+    args = sys.argv[1:]
+    frames = 300
+    if args[:1] == ["--frames"]:
+        frames = int(args[1])
+        args = args[2:]
+    paths = args or [os.path.join(HERE, v) for v in VARIANTS]
+    for path in paths:
+        bench_variant(path, frames)
+
+
+if __name__ == "__main__":
+    main()
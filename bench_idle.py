@@ -0,0 +1,77 @@
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_modes import cpu_seconds, headless_env, process_tree
+
+# ----------------------------------------------------------
+#   CPU В ПРОСТОЕ: скрипт показывает статичный экран, никто не
+#   трогает тач. Запускает скрипты целиком без экранов (SDL dummy)
+#   и печатает CPU всего дерева процессов в процентах одного ядра.
+#   С --before REV те же скрипты дополнительно берутся из git-ревизии
+#   REV (например, до перевода циклов на event.wait) — до/после
+#   в одной таблице.
+#
+#   python bench_idle.py [--before REV] [секунд] [скрипт.py ...]
+# ----------------------------------------------------------
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS = [["6_5lastbest.py"], ["6LAST.py"], ["6LAST.py", "--single"], ["Number32.py"]]
+
+
+def idle_cpu(root, script, seconds):
+    sessions = tempfile.TemporaryDirectory()
+    proc = subprocess.Popen([sys.executable, "-W", "ignore", os.path.join(root, script[0])] + script[1:],
+                            cwd=root, env=headless_env(sessions.name), stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL, start_new_session=True)
+    try:
+        time.sleep(3)  # старт и первые кадры
+        tree = process_tree(proc.pid)
+        cpu_start = sum(cpu_seconds(pid) for pid in tree)
+        time.sleep(seconds)
+        cpu = sum(cpu_seconds(pid) for pid in process_tree(proc.pid)) - cpu_start
+        return len(tree), cpu / seconds * 100
+    finally:
+        os.killpg(proc.pid, signal.SIGKILL)
+        proc.wait()
+        sessions.cleanup()
+
+
+def checkout(rev, path):
+    # дерево ревизии целиком: скрипты импортируют соседние модули
+    archive = subprocess.run(["git", "archive", rev], cwd=HERE, check=True,
+                             capture_output=True).stdout
+    subprocess.run(["tar", "-x", "-C", path], input=archive, check=True)
+
+
+def main():
+    args = sys.argv[1:]
+    before = None
+    if args[:1] == ["--before"]:
+        before = args[1]
+        args = args[2:]
+    seconds = float(args[0]) if args else 10
+    scripts = [[name] for name in args[1:]] or SCRIPTS
+
+    roots = [("сейчас", HERE)]
+    tmp = None
+    if before:
+        tmp = tempfile.TemporaryDirectory()
+        checkout(before, tmp.name)
+        roots.insert(0, (before, tmp.name))
+
+    print(f"скрипт                   версия       процессов   CPU %  ({seconds:.0f} с простоя)")
+    for script in scripts:
+        for label, root in roots:
+            if not os.path.exists(os.path.join(root, script[0])):
+                continue
+            count, cpu = idle_cpu(root, script, seconds)
+            print(f"{' '.join(script):24s} {label:12s} {count:9d} {cpu:7.1f}")
+    if tmp:
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+# ----------------------------------------------------------
+#   СРАВНЕНИЕ РЕЖИМОВ 6LAST.py: процесс на окно / все окна в одном
+#   процессе (--single). Запускает каждый режим без экранов (SDL dummy)
+#   и снимает с дерева процессов память (RSS и PSS — PSS честно делит
+#   страницы, общие после fork) и CPU.
+#
+#   python bench_modes.py [секунд]
+# ----------------------------------------------------------
+HERE = os.path.dirname(os.path.abspath(__file__))
+CLK_TCK = os.sysconf("SC_CLK_TCK")
+
+
+def headless_env(sessions):
+    # окна без экранов (SDL dummy); лог сессий — в sessions, а не в
+    # SESSION_DIR киоска (иначе каждый запуск вытесняет настоящий лог)
+    return dict(os.environ, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy",
+                FIGURES_SESSION_DIR=sessions)
+
+
+def process_tree(root):
+    parents = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except OSError:
+            continue
+        parents.setdefault(ppid, []).append(int(entry))
+    tree, todo = [], [root]
+    while todo:
+        pid = todo.pop()
+        tree.append(pid)
+        todo.extend(parents.get(pid, []))
+    return tree
+
+
+def memory_kb(pid):
+    rss = pss = 0
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Rss:"):
+                rss = int(line.split()[1])
+            elif line.startswith("Pss:"):
+                pss = int(line.split()[1])
+    return rss, pss
+
+
+def cpu_seconds(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / CLK_TCK
+
+
+def measure(args, seconds):
+    sessions = tempfile.TemporaryDirectory()
+    proc = subprocess.Popen([sys.executable, "-W", "ignore", os.path.join(HERE, "6LAST.py")] + args,
+                            cwd=HERE, env=headless_env(sessions.name), stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL, start_new_session=True)
+    try:
+        time.sleep(3)  # старт и первые кадры
+        tree = process_tree(proc.pid)
+        cpu_start = sum(cpu_seconds(pid) for pid in tree)
+        time.sleep(seconds)
+        tree = process_tree(proc.pid)
+        cpu = sum(cpu_seconds(pid) for pid in tree) - cpu_start
+        rss = pss = 0
+        for pid in tree:
+            r, p = memory_kb(pid)
+            rss += r
+            pss += p
+        return len(tree), rss, pss, cpu / seconds * 100
+    finally:
+        os.killpg(proc.pid, signal.SIGKILL)
+        proc.wait()
+        sessions.cleanup()
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    print(f"режим                 процессов   RSS МБ   PSS МБ   CPU %  ({seconds:.0f} с простоя)")
+    for name, args in (("процесс на окно", []), ("один процесс", ["--single"])):
+        count, rss, pss, cpu = measure(args, seconds)
+        print(f"{name:20s} {count:10d} {rss / 1024:8.1f} {pss / 1024:8.1f} {cpu:7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import os
+import queue
+import random
+import re
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from bench_control import SOCKET, Client
+from bench_modes import headless_env, process_tree
+
+# ----------------------------------------------------------
+#   СТОРОЖ ОКОН: запускает 6LAST.py целиком без экранов (SDL dummy)
+#   и раз за разом выбирает случайное окно: "падение" — SIGKILL,
+#   "зависание" — SIGSTOP (процесс жив, но не отмечается). Меряет
+#   время от сигнала до первого кадра нового окна (по строке main
+#   "окно восстановлено") и печатает медиану и максимум по видам
+#   сбоев. Зависание находит только таймаут сторожа, поэтому в нём
+#   есть HEARTBEAT_TIMEOUT; "перезапуск" — от обнаружения до кадра.
+#   Перед каждым сбоем через управляющий сокет включается игра и
+#   случайный раунд; новое окно должно показать именно их (режим,
+#   раунд и фигуры первого кадра окна — в той же строке main).
+#
+#   python bench_watchdog.py [сбоев] [--single]
+# ----------------------------------------------------------
+HERE = os.path.dirname(os.path.abspath(__file__))
+DIED = re.compile(r"^(.+): окно завершилось с кодом (-?\d+), перезапуск")
+RECOVERED = re.compile(r"^(\S+): окно восстановлено за (\d+) мс "
+                       r"\(режим (\w+), раунд (\d+)(, фигуры не этого раунда)?\)")
+KINDS = {"падение": signal.SIGKILL, "зависание": signal.SIGSTOP}
+
+
+def read_lines(stream, lines):
+    # строки вывода main с моментом получения
+    for line in stream:
+        lines.put((time.monotonic(), line.rstrip("\n")))
+
+
+def windows_of(pid):
+    # процессы окон: дети main с той же командной строкой (fork), без
+    # resource_tracker общей памяти
+    with open(f"/proc/{pid}/cmdline", "rb") as f:
+        cmdline = f.read()
+    found = []
+    for child in process_tree(pid)[1:]:
+        try:
+            with open(f"/proc/{child}/cmdline", "rb") as f:
+                if f.read() == cmdline:
+                    found.append(child)
+        except OSError:
+            pass
+    return found
+
+
+def wait_line(lines, pattern, timeout):
+    # (момент, совпадение) первой подходящей строки или None
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            at, line = lines.get(timeout=max(0, deadline - time.monotonic()))
+        except queue.Empty:
+            return None
+        match = pattern.search(line)
+        if match:
+            return at, match
+
+
+def percentiles(samples):
+    ms = sorted(x * 1000 for x in samples)
+    return f"n={len(ms):3d} медиана {ms[len(ms) // 2]:7.0f} мс, макс {ms[-1]:7.0f} мс"
+
+
+def main():
+    args = sys.argv[1:]
+    single = "--single" in args
+    args = [a for a in args if a != "--single"]
+    faults = int(args[0]) if args else 20
+
+    sessions = tempfile.TemporaryDirectory()
+    proc = subprocess.Popen([sys.executable, "-u", "-W", "ignore", os.path.join(HERE, "6LAST.py")]
+                            + (["--single"] if single else []),
+                            cwd=HERE, env=headless_env(sessions.name), stdout=subprocess.PIPE,
+                            stderr=subprocess.DEVNULL,
+                            text=True, start_new_session=True)
+    lines = queue.Queue()
+    threading.Thread(target=read_lines, args=(proc.stdout, lines), daemon=True).start()
+    rnd = random.Random(1)
+    total = {kind: [] for kind in KINDS}    # сигнал -> первый кадр нового окна
+    restart = {kind: [] for kind in KINDS}  # обнаружение -> первый кадр (по main)
+    lost = 0
+    wrong = 0  # новое окно показало не тот режим или раунд
+    try:
+        time.sleep(3)  # старт и первые кадры
+        client = Client(SOCKET)
+        for _ in range(faults):
+            # окно должно вернуться в игру на текущем раунде, а не в заставку раунда 1
+            round_id = rnd.randrange(2, 100000)
+            for command in ("mode game", f"round {round_id}"):
+                reply = client.call(command)
+                assert reply.startswith("ok"), reply
+            victims = windows_of(proc.pid)
+            if not victims:
+                print("окон нет — main их не перезапустил")
+                lost += 1
+                break
+            kind = rnd.choice(list(KINDS))
+            victim = rnd.choice(victims)
+            sent = time.monotonic()
+            os.kill(victim, KINDS[kind])
+            # с --single процесс один на все окна: восстанавливаются все
+            died = wait_line(lines, DIED, 15)
+            names = died[1].group(1).split(", ") if died else []
+            found = [wait_line(lines, RECOVERED, 15) for _ in names]
+            if not names or None in found:
+                print(f"{kind} pid {victim}: окно не восстановилось")
+                lost += 1
+                continue
+            at, match = found[-1]
+            total[kind].append(at - sent)
+            restart[kind].append(int(match.group(2)) / 1000)
+            shown = [(m.group(3), int(m.group(4)), m.group(5)) for _, m in found]
+            resumed = all(shown_as == ("game", round_id, None) for shown_as in shown)
+            if not resumed:
+                wrong += 1
+            print(f"{kind:10s} {', '.join(names):16s} {(at - sent) * 1000:6.0f} мс "
+                  f"(режим {match.group(3)}, раунд {match.group(4)}{match.group(5) or ''}"
+                  f"{'' if resumed else f' — ожидался game, раунд {round_id}'})")
+            # новое окно успевает поработать до следующего сбоя
+            time.sleep(rnd.uniform(0.5, 1.5))
+    finally:
+        os.killpg(proc.pid, signal.SIGKILL)
+        proc.wait()
+        sessions.cleanup()
+
+    print()
+    for kind in KINDS:
+        if total[kind]:
+            print(f"{kind:10s} сигнал -> кадр:     {percentiles(total[kind])}")
+            print(f"{'':10s} перезапуск -> кадр: {percentiles(restart[kind])}")
+    if wrong:
+        print(f"восстановлено не в том режиме или раунде: {wrong}")
+    if lost:
+        print(f"не восстановлено: {lost}")
+    if lost or wrong:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
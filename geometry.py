@@ -0,0 +1,135 @@
+import math
+from functools import lru_cache
+
+import pygame
+
+# ----------------------------------------------------------
+#   ГЕОМЕТРИЯ ФИГУР (без привязки к разрешению)
+#   Каждая фигура описана один раз в нормированных координатах:
+#   центр (0, 0), фигура вписана в квадрат [-1, 1] x [-1, 1].
+#   На экране фигура рисуется в квадрат box x box пикселей:
+#   вершины в пикселях (смещения от центра, целые) считаются один
+#   раз на (фигура, box) и лежат в кэше, кадр только сдвигает их
+#   в центр.
+#   box для экрана подбирают mirror_layout / controller_layout —
+#   фигуры растут вместе с панелью, а не заданы в пикселях.
+# ----------------------------------------------------------
+_HEXAGON = tuple((0.9 * math.cos(k * math.pi / 3), 0.9 * math.sin(k * math.pi / 3))
+                 for k in range(6))
+
+# части фигуры: ("circle", центр, радиус), ("rect", (left, top, w, h)),
+# ("polygon", вершины)
+SHAPES = {
+    "circle":   (("circle", (0.0, 0.0), 0.8),),
+    "square":   (("rect", (-0.8, -0.8, 1.6, 1.6)),),
+    "triangle": (("polygon", ((0.0, -1.0), (-0.9, 0.8), (0.9, 0.8))),),
+    "hexagon":  (("polygon", _HEXAGON),),
+    "cross":    (("rect", (-0.25, -0.8, 0.5, 1.6)), ("rect", (-0.8, -0.25, 1.6, 0.5))),
+}
+
+
+@lru_cache(maxsize=256)
+def vertices(shape, box):
+    # части фигуры в пикселях для квадрата box x box (смещения от центра)
+    half = box / 2
+    parts = []
+    for kind, *args in SHAPES[shape]:
+        if kind == "circle":
+            (cx, cy), r = args
+            parts.append((kind, (round(cx * half), round(cy * half)), round(r * half)))
+        elif kind == "rect":
+            parts.append((kind, tuple(round(v * half) for v in args[0])))
+        else:
+            parts.append((kind, tuple((round(x * half), round(y * half)) for x, y in args[0])))
+    return tuple(parts)
+
+
+def draw(surface, shape, center, color, box):
+    x, y = center
+    for kind, *args in vertices(shape, box):
+        if kind == "circle":
+            (dx, dy), r = args
+            pygame.draw.circle(surface, color, (x + dx, y + dy), r)
+        elif kind == "rect":
+            left, top, w, h = args[0]
+            pygame.draw.rect(surface, color, (x + left, y + top, w, h))
+        else:
+            pygame.draw.polygon(surface, color, [(x + dx, y + dy) for dx, dy in args[0]])
+
+
+# ---------------- раскладка по экрану ----------------
+def mirror_layout(size):
+    # зеркало: две фигуры рядом. (box, [центр первой, центр второй])
+    width, height = size
+    box = min(height * 2 // 3, width * 2 // 5)
+    offset = width // 20
+    y = height // 2
+    return box, [(width // 3 - offset, y), (2 * width // 3 + offset, y)]
+
+
+def controller_layout(size):
+    # DSI: одна фигура по центру, выше середины. (box, центр)
+    width, height = size
+    return min(height * 5 // 6, width * 5 // 6), (width // 2, height * 11 // 24)
+
+
+if __name__ == "__main__":
+    # самопроверка: при box 400 — те же пиксели, что у прежних draw_* (радиус 160 и т.д.)
+    import time
+
+    def old_hexagon(screen, x, y, color):
+        r = 180
+        points = [(x + r, y), (x + r/2, y + int(r*0.87)), (x - r/2, y + int(r*0.87)),
+                  (x - r, y), (x - r/2, y - int(r*0.87)), (x + r/2, y - int(r*0.87))]
+        pygame.draw.polygon(screen, color, points)
+
+    def old_cross(screen, x, y, color):
+        pygame.draw.rect(screen, color, (x - 50, y - 160, 100, 320))
+        pygame.draw.rect(screen, color, (x - 160, y - 50, 320, 100))
+
+    old = {
+        "circle": lambda s, x, y, c: pygame.draw.circle(s, c, (x, y), 160),
+        "square": lambda s, x, y, c: pygame.draw.rect(s, c, (x - 160, y - 160, 320, 320)),
+        "triangle": lambda s, x, y, c: pygame.draw.polygon(
+            s, c, [(x, y-200), (x-180, y+160), (x+180, y+160)]),
+        "hexagon": old_hexagon,
+        "cross": old_cross,
+    }
+    for shape, func in old.items():
+        a = pygame.Surface((400, 400))
+        b = pygame.Surface((400, 400))
+        func(a, 200, 200, (255, 0, 0))
+        draw(b, shape, (200, 200), (255, 0, 0), 400)
+        assert pygame.image.tobytes(a, "RGB") == pygame.image.tobytes(b, "RGB"), shape
+
+    # любая фигура при любом box — внутри своего квадрата
+    for box in (50, 125, 333, 400, 720):
+        for shape in SHAPES:
+            s = pygame.Surface((box + 2, box + 2), pygame.SRCALPHA)
+            draw(s, shape, (box // 2 + 1, box // 2 + 1), (255, 255, 255), box)
+            bounds = s.get_bounding_rect()
+            assert pygame.Rect(0, 0, box + 2, box + 2).contains(bounds) and bounds.w <= box + 1, \
+                (shape, box, bounds)
+
+    assert mirror_layout((1024, 600))[0] == 400 and controller_layout((800, 480)) == (400, (400, 220))
+    assert mirror_layout((1920, 1080))[0] == 720
+
+    # цена: вершины из кэша против пересчёта на каждый кадр, и сама растеризация
+    surface = pygame.Surface((1024, 600))
+    reps = 2000
+    for shape in SHAPES:
+        t = time.perf_counter()
+        for _ in range(reps):
+            vertices(shape, 400)
+        cached = (time.perf_counter() - t) / reps * 1e6
+        t = time.perf_counter()
+        for _ in range(reps):
+            vertices.__wrapped__(shape, 400)
+        cold = (time.perf_counter() - t) / reps * 1e6
+        t = time.perf_counter()
+        for _ in range(reps // 10):
+            draw(surface, shape, (400, 300), (0, 128, 255), 400)
+        full = (time.perf_counter() - t) / (reps // 10) * 1e6
+        print(f"  {shape:9s} вершины: кэш {cached:5.2f} мкс, расчёт {cold:5.2f} мкс; "
+              f"draw() {full:5.1f} мкс")
+    print("geometry: ok")
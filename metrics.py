@@ -0,0 +1,191 @@
+import bisect
+import math
+import os
+import struct
+from multiprocessing import shared_memory
+
+# ----------------------------------------------------------
+#   МЕТРИКИ ПРОЦЕССОВ (shared memory)
+#   У каждого процесса (main и каждое окно) свой слот в общем блоке
+#   памяти: гистограммы времени кадра, отрисовки и refresh плюс
+#   несколько последних значений (gauge). Процесс пишет только
+#   в свой слот, по pipe метрики не ходят — запись стоит одного
+#   bisect и пары сложений. main читает все слоты и отдаёт их в
+#   формате Prometheus (text exposition).
+# ----------------------------------------------------------
+# верхние границы корзин, сек (последняя корзина — +Inf)
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.002, 0.004, 0.008, 0.016, 0.033, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# гистограммы: имя, описание
+HISTOGRAMS = (
+    ("frame_seconds", "Время кадра: отрисовка и вывод на экран"),
+    ("draw_seconds", "Время отрисовки кадра в поверхность"),
+    ("refresh_seconds", "Тап refresh -> новый раунд (main: до публикации, DSI: до получения)"),
+    ("present_skew_seconds", "Разброс моментов смены раунда между экранами (main)"),
+    ("control_command_seconds", "Команда управляющего сокета: разбор и применение (main)"),
+)
+FRAME, DRAW, REFRESH, SKEW, CONTROL = range(len(HISTOGRAMS))
+
+# gauge: имя, описание
+GAUGES = (
+    ("ipc_queue_depth", "Сообщений в pipe при последнем чтении"),
+    ("ipc_queue_depth_max", "Максимум сообщений в pipe за одно чтение"),
+    ("cpu_temperature_celsius", "Температура CPU"),
+    ("heartbeat_seconds", "CLOCK_MONOTONIC последнего прохода цикла окна (по нему сторож main)"),
+    ("window_restarts", "Перезапусков упавших и зависших окон (main)"),
+    ("pipe_conflated", "Сообщений от main, замещённых более новыми того же типа (не разобраны)"),
+)
+QUEUE_DEPTH, QUEUE_DEPTH_MAX, TEMPERATURE, HEARTBEAT, RESTARTS, CONFLATED = range(len(GAUGES))
+
+PREFIX = "figures_"
+# гистограмма в слоте: счётчики корзин (+Inf последней) и сумма
+HIST_LEN = len(BUCKETS) + 2
+SLOT_LEN = len(HISTOGRAMS) * HIST_LEN + len(GAUGES)
+SLOT_SIZE = SLOT_LEN * struct.calcsize("d")
+
+
+class MetricsSlot:
+    # запись метрик одного процесса; buf — память слота
+    def __init__(self, buf):
+        self._values = buf.cast("d")
+
+    @classmethod
+    def local(cls):
+        # слот без общей памяти (окно запущено не из main, например бенчмарком)
+        return cls(memoryview(bytearray(SLOT_SIZE)))
+
+    def observe(self, histogram, seconds):
+        base = histogram * HIST_LEN
+        values = self._values
+        values[base + bisect.bisect_left(BUCKETS, seconds)] += 1
+        values[base + HIST_LEN - 1] += seconds
+
+    def set(self, gauge, value):
+        self._values[len(HISTOGRAMS) * HIST_LEN + gauge] = value
+
+    def queue_depth(self, depth):
+        self.set(QUEUE_DEPTH, depth)
+        if depth > self.get(QUEUE_DEPTH_MAX):
+            self.set(QUEUE_DEPTH_MAX, depth)
+
+    def get(self, gauge):
+        return self._values[len(HISTOGRAMS) * HIST_LEN + gauge]
+
+    def histogram(self, histogram):
+        # (счётчики корзин, сумма)
+        base = histogram * HIST_LEN
+        return list(self._values[base:base + HIST_LEN - 1]), self._values[base + HIST_LEN - 1]
+
+    def release(self):
+        self._values.release()
+
+
+class MetricsBlock:
+    def __init__(self, processes, name=None):
+        # processes — имена процессов (метка process="..."), по слоту на каждое
+        self.processes = list(processes)
+        size = SLOT_SIZE * len(self.processes)
+        if name is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+            self._owner = True
+            self._shm.buf[:size] = bytes(size)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+            self._owner = False
+        self._slots = {}
+
+    # при передаче в Process (spawn/forkserver) подключаемся к тому же блоку
+    def __reduce__(self):
+        return (MetricsBlock, (self.processes, self._shm.name))
+
+    def slot(self, process):
+        slot = self._slots.get(process)
+        if slot is None:
+            start = self.processes.index(process) * SLOT_SIZE
+            slot = self._slots[process] = MetricsSlot(self._shm.buf[start:start + SLOT_SIZE])
+        return slot
+
+    def prometheus(self):
+        lines = []
+        for h, (name, help_text) in enumerate(HISTOGRAMS):
+            lines.append(f"# HELP {PREFIX}{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}{name} histogram")
+            for process in self.processes:
+                counts, total = self.slot(process).histogram(h)
+                if not any(counts):
+                    continue
+                cumulative = 0
+                for bound, count in zip(BUCKETS + (math.inf,), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == math.inf else repr(bound)
+                    lines.append(f'{PREFIX}{name}_bucket{{process="{process}",le="{le}"}} {cumulative:.0f}')
+                lines.append(f'{PREFIX}{name}_sum{{process="{process}"}} {total:.6f}')
+                lines.append(f'{PREFIX}{name}_count{{process="{process}"}} {cumulative:.0f}')
+        for g, (name, help_text) in enumerate(GAUGES):
+            lines.append(f"# HELP {PREFIX}{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}{name} gauge")
+            for process in self.processes:
+                lines.append(f'{PREFIX}{name}{{process="{process}"}} {self.slot(process).get(g):g}')
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        # для textfile collector node_exporter: пишем рядом и переименовываем,
+        # чтобы он никогда не прочитал половину файла
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.prometheus())
+        os.replace(tmp, path)
+
+    def close(self):
+        for slot in self._slots.values():
+            slot.release()
+        self._slots = {}
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+if __name__ == "__main__":
+    # самопроверка и цена одной записи
+    import multiprocessing
+    import time
+
+    block = MetricsBlock(["main", "HDMI1"])
+
+    def child(block):
+        slot = block.slot("HDMI1")
+        for ms in (0.5, 3, 3, 12, 40, 2000):
+            slot.observe(FRAME, ms / 1000)
+        slot.queue_depth(3)
+        slot.queue_depth(1)
+
+    proc = multiprocessing.get_context("fork").Process(target=child, args=(block,))
+    proc.start()
+    proc.join()
+    block.slot("main").set(TEMPERATURE, 61.5)
+
+    text = block.prometheus()
+    assert 'figures_frame_seconds_bucket{process="HDMI1",le="0.001"} 1' in text
+    assert 'figures_frame_seconds_bucket{process="HDMI1",le="0.004"} 3' in text
+    assert 'figures_frame_seconds_bucket{process="HDMI1",le="1.0"} 5' in text
+    assert 'figures_frame_seconds_bucket{process="HDMI1",le="+Inf"} 6' in text
+    assert 'figures_frame_seconds_count{process="HDMI1"} 6' in text
+    assert 'figures_frame_seconds_sum{process="HDMI1"} 2.058500' in text
+    assert 'frame_seconds_bucket{process="main"' not in text  # пустые не печатаются
+    assert 'figures_ipc_queue_depth{process="HDMI1"} 1' in text
+    assert 'figures_ipc_queue_depth_max{process="HDMI1"} 3' in text
+    assert 'figures_cpu_temperature_celsius{process="main"} 61.5' in text
+
+    slot = MetricsSlot.local()
+    reps = 200000
+    t = time.perf_counter()
+    for i in range(reps):
+        slot.observe(FRAME, 0.004)
+    per_observe = (time.perf_counter() - t) / reps * 1e6
+    t = time.perf_counter()
+    for i in range(1000):
+        block.prometheus()
+    per_export = (time.perf_counter() - t) / 1000 * 1e6
+    slot.release()
+    block.close()
+    print(f"metrics: ok, observe {per_observe:.2f} мкс, экспорт {per_export:.0f} мкс")
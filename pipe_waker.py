@@ -0,0 +1,43 @@
+import threading
+from multiprocessing.connection import wait
+
+import pygame
+
+# ----------------------------------------------------------
+#   ПРОБУЖДЕНИЕ ЦИКЛА ОКНА ПО PIPE
+#   Цикл окна спит в pygame.event.wait(), пока нет событий.
+#   Сообщения от main приходят не в очередь SDL, а в pipe, поэтому
+#   фоновый поток ждёт данных в pipe и кладёт в очередь событие
+#   WAKE_EVENT. Следующее пробуждение — только после rearm(), то есть
+#   когда цикл уже вычитал pipe, иначе поток крутился бы на тех же
+#   непрочитанных данных.
+# ----------------------------------------------------------
+WAKE_EVENT = pygame.USEREVENT  # в pipe от main что-то пришло
+
+
+class PipeWaker:
+    def __init__(self, conns):
+        self.conns = list(conns)
+        self._drained = threading.Event()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def rearm(self):
+        # цикл окна прочитал всё из pipe — можно ждать следующего сообщения
+        self._drained.set()
+
+    def remove(self, conn):
+        # окно закрылось раньше процесса (режим "один процесс")
+        self.conns.remove(conn)
+
+    def _run(self):
+        while True:
+            try:
+                wait(self.conns)
+            except (OSError, ValueError):
+                return  # pipe закрыт
+            self._drained.clear()
+            try:
+                pygame.event.post(pygame.event.Event(WAKE_EVENT))
+            except pygame.error:
+                return  # окно уже закрылось (pygame.quit)
+            self._drained.wait()
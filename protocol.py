@@ -0,0 +1,310 @@
+import os
+import struct
+from collections import namedtuple
+
+# ----------------------------------------------------------
+#   ДВОИЧНЫЙ ПРОТОКОЛ PIPE
+#   Каждое сообщение — кадр фиксированного размера (struct),
+#   уходит через send_bytes/recv_bytes без pickle:
+#     версия, тип, индексы фигур/цветов (shape0, color0, shape1,
+#     color1), round_id, req_id, два числа t0/t1 (время тапа,
+#     моменты первого кадра, температура — зависит от типа).
+#   Фигуры и цвета передаются индексами в общих таблицах, как в
+#   round_state.py. Кадр другой версии или размера — ProtocolError.
+#
+#   Окно читает pipe от main через Mailbox: из кадров, что скопились,
+#   пока окно было занято, от каждого типа разбирается только
+#   последний — более ранние того же типа вычитываются без decode.
+# ----------------------------------------------------------
+VERSION = 1
+FRAME = struct.Struct("<BB4BIIdd")
+
+# типы сообщений
+WAKE = 1         # main -> окно: состояние в общей памяти поменялось
+QUIT = 2         # main -> окно: завершиться
+START = 3        # DSI -> main: тап на заставке (t0 — момент тапа)
+REFRESH = 4      # DSI -> main: новый раунд (t0 — момент тапа, req_id — id запроса)
+FIRST_FRAME = 5  # окно -> main: первый кадр (t0 — monotonic, t1 — CLOCK_BOOTTIME;
+                 # round_id и figures — раунд на кадре, без figures — заставка)
+TEMP = 6         # DSI -> main: температура CPU в t0, °C
+FIGURES = 7      # main -> окна: фигуры раунда (скрипты без общей памяти)
+PRESENTED = 8    # окно -> main: публикация показана (round_id — её seq, t0 — момент
+                 # вывода кадра, t1 — назначенный present_at)
+KINDS = (WAKE, QUIT, START, REFRESH, FIRST_FRAME, TEMP, FIGURES, PRESENTED)
+
+# figures — None или [(фигура, цвет), (фигура, цвет)]
+Message = namedtuple("Message", "kind round_id req_id figures t0 t1")
+
+NO_FIGURES = (0xFF, 0xFF, 0xFF, 0xFF)
+
+
+class ProtocolError(ValueError):
+    pass
+
+
+class Codec:
+    def __init__(self, shapes, colors):
+        self.shapes = list(shapes)
+        self.colors = [tuple(c) for c in colors]
+        self._shape_index = {shape: i for i, shape in enumerate(self.shapes)}
+        self._color_index = {color: i for i, color in enumerate(self.colors)}
+        # кадры без полей собираются один раз
+        self._plain = {kind: FRAME.pack(VERSION, kind, *NO_FIGURES, 0, 0, 0.0, 0.0)
+                       for kind in KINDS}
+
+    def encode(self, kind, round_id=0, req_id=0, figures=None, t0=0.0, t1=0.0):
+        if figures is None:
+            if not (round_id or req_id or t0 or t1):
+                return self._plain[kind]
+            indices = NO_FIGURES
+        else:
+            (s0, c0), (s1, c1) = figures
+            indices = (self._shape_index[s0], self._color_index[tuple(c0)],
+                       self._shape_index[s1], self._color_index[tuple(c1)])
+        return FRAME.pack(VERSION, kind, *indices, round_id, req_id, t0, t1)
+
+    def decode(self, data):
+        if len(data) != FRAME.size:
+            raise ProtocolError(f"кадр {len(data)} байт, ожидается {FRAME.size}")
+        version, kind, s0, c0, s1, c1, round_id, req_id, t0, t1 = FRAME.unpack(data)
+        if version != VERSION:
+            raise ProtocolError(f"версия протокола {version}, ожидается {VERSION}")
+        if kind not in KINDS:
+            raise ProtocolError(f"неизвестный тип сообщения {kind}")
+        figures = None
+        if s0 != 0xFF:
+            figures = [(self.shapes[s0], self.colors[c0]), (self.shapes[s1], self.colors[c1])]
+        return Message(kind, round_id, req_id, figures, t0, t1)
+
+    def send(self, conn, kind, **fields):
+        conn.send_bytes(self.encode(kind, **fields))
+
+    def recv(self, conn):
+        # EOFError, как у conn.recv(), если другой конец закрыт
+        return self.decode(conn.recv_bytes())
+
+
+class Mailbox:
+    # входящие сообщения окна: важно только новейшее значение каждого типа
+    # (WAKE, FIGURES, QUIT), поэтому кадр, за которым в pipe лежит кадр
+    # того же типа, не разбирается вовсе. Pipe читается кусками до CHUNK
+    # байт, а не recv_bytes на кадр: у окна, что долго рисовало, очередь
+    # вычитывается за несколько системных вызовов. Читать conn в обход
+    # mailbox нельзя — в буфере может остаться начало кадра
+    CHUNK = 65536
+    # заголовок Connection.send_bytes: длина кадра (big-endian int32)
+    LENGTH = struct.Struct("!i")
+
+    def __init__(self, codec, conn):
+        self.codec = codec
+        self.conn = conn
+        self.received = 0   # всего кадров
+        self.conflated = 0  # из них замещены более новыми того же типа
+        self.closed = False  # другой конец закрыт
+        self._buffer = b""  # прочитанное, но ещё не разобранное (конец неполного кадра)
+
+    def drain(self):
+        # всё, что пришло с прошлого вызова: последнее сообщение каждого
+        # типа, в порядке прихода этих последних
+        chunks = [self._buffer]
+        while not self.closed and self.conn.poll():
+            chunk = os.read(self.conn.fileno(), self.CHUNK)
+            if not chunk:
+                self.closed = True
+            chunks.append(chunk)
+        data = b"".join(chunks)
+
+        latest = {}  # тип -> (начало, длина) последнего кадра
+        pos = 0
+        end = len(data) - self.LENGTH.size
+        while pos <= end:
+            (size,) = self.LENGTH.unpack_from(data, pos)
+            start = pos + self.LENGTH.size
+            if start + size > len(data):
+                break  # кадр дочитается в следующий раз
+            # тип — второй байт кадра; кадр другого размера разберёт (и
+            # отвергнет) decode
+            kind = data[start + 1] if size == FRAME.size else None
+            if latest.pop(kind, None) is not None:
+                self.conflated += 1
+            latest[kind] = (start, size)
+            self.received += 1
+            pos = start + size
+        self._buffer = data[pos:]
+        return [self.codec.decode(data[start:start + size]) for start, size in latest.values()]
+
+
+if __name__ == "__main__":
+    # самопроверка и сравнение с pickle (conn.send/recv)
+    import threading
+    import time
+    from multiprocessing import Pipe
+    from multiprocessing.reduction import ForkingPickler
+
+    shapes = ["circle", "hexagon", "triangle", "cross", "square"]
+    colors = [(255, 165, 0), (200, 0, 200), (0, 200, 0), (0, 128, 255), (255, 0, 0)]
+    codec = Codec(shapes, colors)
+    figures = [("circle", (0, 200, 0)), ("square", (0, 128, 255))]
+
+    # кодирование туда-обратно
+    cases = [(WAKE, {}), (QUIT, {}), (START, {"t0": 12.5}),
+             (REFRESH, {"t0": 1234.000125, "req_id": 7}),
+             (FIRST_FRAME, {"t0": 1.25, "t1": 99.5}), (TEMP, {"t0": 61.3}),
+             (FIGURES, {"figures": figures, "round_id": 4000000000}),
+             (PRESENTED, {"round_id": 12, "t0": 100.0125, "t1": 100.01})]
+    for kind, fields in cases:
+        data = codec.encode(kind, **fields)
+        assert len(data) == FRAME.size
+        msg = codec.decode(data)
+        expected = Message(kind, fields.get("round_id", 0), fields.get("req_id", 0),
+                           fields.get("figures"), fields.get("t0", 0.0), fields.get("t1", 0.0))
+        assert msg == expected, (msg, expected)
+    assert codec.encode(QUIT) is codec.encode(QUIT)
+
+    # испорченные кадры
+    good = codec.encode(REFRESH, req_id=1)
+    for bad in (good[:-1], good + b"\0", bytes([VERSION + 1]) + good[1:], good[:1] + b"\x63" + good[2:]):
+        try:
+            codec.decode(bad)
+        except ProtocolError:
+            pass
+        else:
+            raise AssertionError(bad)
+
+    # через настоящий Pipe, включая EOF
+    a, b = Pipe()
+    codec.send(a, FIGURES, figures=figures, round_id=3)
+    assert codec.recv(b).figures == figures
+    a.close()
+    try:
+        codec.recv(b)
+    except EOFError:
+        pass
+    else:
+        raise AssertionError("EOF")
+
+    # mailbox: из потока кадров — последний каждого типа, порядок по приходу
+    a, b = Pipe()
+    mailbox = Mailbox(codec, b)
+    other = [("triangle", (255, 0, 0)), ("cross", (200, 0, 200))]
+    for i in range(5):
+        codec.send(a, FIGURES, figures=figures if i % 2 else other, round_id=i)
+        codec.send(a, WAKE)
+    codec.send(a, QUIT)
+    assert [(m.kind, m.round_id) for m in mailbox.drain()] == [(FIGURES, 4), (WAKE, 0), (QUIT, 0)]
+    assert mailbox.drain() == [] and (mailbox.received, mailbox.conflated) == (11, 8)
+    a.send_bytes(good[:-1])
+    try:
+        mailbox.drain()
+    except ProtocolError:
+        pass
+    else:
+        raise AssertionError("mailbox: испорченный кадр")
+    codec.send(a, WAKE)
+    a.close()
+    assert [m.kind for m in mailbox.drain()] == [WAKE] and mailbox.closed
+    print("protocol: ok")
+
+    # микро-бенчмарк: один и тот же refresh и рассылка фигур
+    reps = 100000
+    pickled = [("refresh", 1234.5, 7), figures]
+    binary = [(REFRESH, {"t0": 1234.5, "req_id": 7}), (FIGURES, {"figures": figures})]
+    print(f"{'сообщение':12s} {'pickle байт':>11s} {'кадр байт':>9s} "
+          f"{'pickle мкс':>10s} {'кадр мкс':>9s}   (encode+decode)")
+    for obj, (kind, fields) in zip(pickled, binary):
+        size_p = len(ForkingPickler.dumps(obj))
+        t = time.perf_counter()
+        for _ in range(reps):
+            ForkingPickler.loads(ForkingPickler.dumps(obj))
+        us_p = (time.perf_counter() - t) / reps * 1e6
+        t = time.perf_counter()
+        for _ in range(reps):
+            codec.decode(codec.encode(kind, **fields))
+        us_b = (time.perf_counter() - t) / reps * 1e6
+        name = "refresh" if kind == REFRESH else "figures"
+        print(f"{name:12s} {size_p:11d} {FRAME.size:9d} {us_p:10.2f} {us_b:9.2f}")
+
+    # туда-обратно через Pipe: эхо в соседнем потоке
+    def echo(conn, binary):
+        while True:
+            try:
+                data = conn.recv_bytes() if binary else conn.recv()
+            except EOFError:
+                return
+            if binary:
+                conn.send_bytes(data)
+            else:
+                conn.send(data)
+
+    reps = 20000
+    for binary in (False, True):
+        a, b = Pipe()
+        thread = threading.Thread(target=echo, args=(b, binary), daemon=True)
+        thread.start()
+        t = time.perf_counter()
+        for _ in range(reps):
+            if binary:
+                codec.send(a, FIGURES, figures=figures)
+                codec.recv(a)
+            else:
+                a.send(figures)
+                a.recv()
+        us = (time.perf_counter() - t) / reps * 1e6
+        a.close()
+        thread.join()
+        print(f"туда-обратно через Pipe, {'кадр' if binary else 'pickle'}: {us:.1f} мкс")
+
+    # поток кадров в занятое окно: отправитель шлёт без пауз, получатель
+    # между чтениями "рисует" 20 мс. Последние фигуры и QUIT не теряются;
+    # сравнение — разбор каждого кадра (while poll: recv) и Mailbox
+    import multiprocessing
+
+    def flood(conn, seconds):
+        end = time.monotonic() + seconds
+        sent = 0
+        while time.monotonic() < end:
+            sent += 1
+            codec.send(conn, FIGURES, figures=figures if sent % 2 else other, round_id=sent)
+            codec.send(conn, WAKE)
+        codec.send(conn, QUIT, round_id=sent)  # номер последних фигур
+        conn.close()
+
+    mp = multiprocessing.get_context("fork")
+    print(f"{'чтение':10s} {'кадров':>8s} {'разобрано':>10s} {'чтений':>7s} {'мкс CPU на кадр':>16s}")
+    for conflate in (False, True):
+        a, b = mp.Pipe()
+        sender = mp.Process(target=flood, args=(a, 1.0))
+        sender.start()
+        a.close()
+        mailbox = Mailbox(codec, b)
+        frames = decoded = drains = 0
+        work = 0.0
+        last = quit_at = None
+        while quit_at is None:
+            time.sleep(0.02)
+            t = time.process_time()  # CPU получателя: отправитель делит с ним ядро
+            if conflate:
+                received = mailbox.received
+                messages = mailbox.drain()
+                frames += mailbox.received - received
+            else:
+                messages = []
+                while b.poll():
+                    messages.append(codec.recv(b))
+                    if messages[-1].kind == QUIT:
+                        break  # дальше только EOF
+                frames += len(messages)
+            for msg in messages:
+                if msg.kind == FIGURES:
+                    last = msg.round_id
+                elif msg.kind == QUIT:
+                    quit_at = msg.round_id
+            work += time.process_time() - t
+            decoded += len(messages)
+            drains += 1
+        sender.join()
+        b.close()
+        assert last == quit_at, (last, quit_at)
+        assert not conflate or decoded <= 3 * drains
+        print(f"{'mailbox' if conflate else 'по одному':10s} {frames:8d} {decoded:10d} "
+              f"{drains:7d} {work / frames * 1e6:16.2f}")
@@ -0,0 +1,338 @@
+import os
+import struct
+from collections import OrderedDict
+
+import pygame
+
+# ----------------------------------------------------------
+#   КЭШ ЗАСТАВКИ
+#   масштабируем картинку один раз на каждый размер экрана,
+#   результат convert() под формат дисплея.
+#   Рядом с исходником лежит дисковый кэш уже отмасштабированных
+#   пикселей (RGB), чтобы при холодном старте не декодировать PNG
+#   и не делать smoothscale. Кэш сбрасывается, если у исходника
+#   поменялись mtime или размер файла.
+# ----------------------------------------------------------
+SPLASH_CACHE_MAGIC = b"SPL1"
+# magic, mtime_ns исходника, размер исходника, ширина, высота
+SPLASH_CACHE_HEADER = struct.Struct("<4sqqII")
+
+
+def splash_cache_path(path, size):
+    return f"{path}.{size[0]}x{size[1]}.cache"
+
+
+class SplashCache:
+    def __init__(self, path, name="splash"):
+        self.path = path
+        self.name = name          # для сообщений в консоль (HDMI / DSI)
+        self._source = None       # декодированный PNG (только при промахе)
+        self._scaled = {}         # (w, h) -> Surface
+        self._fast = set()        # размеры, отмасштабированные без сглаживания
+        self._failed = False
+
+    def get(self, size, smooth=True):
+        # smooth=False (перегрев) — при промахе быстрое scale вместо
+        # smoothscale; такой результат не пишется на диск и заменяется
+        # сглаженным, когда его снова попросят с smooth=True
+        size = tuple(size)
+        surf = self._scaled.get(size)
+        if smooth and size in self._fast:
+            surf = None
+        if surf is None and not self._failed:
+            surf = self._load(size, smooth)
+            if surf is not None:
+                self._scaled[size] = surf
+        return surf
+
+    def _load(self, size, smooth):
+        try:
+            st = os.stat(self.path)
+        except OSError as e:
+            print(f"{self.name}: не удалось загрузить заставку:", e)
+            self._failed = True
+            return None
+
+        cache_file = splash_cache_path(self.path, size)
+        raw = self._read_disk(cache_file, st, size)
+        if raw is not None:
+            # на диске всегда сглаженная версия — она годится при любом smooth
+            self._fast.discard(size)
+            return self._convert(pygame.image.fromstring(raw, size, "RGB"))
+
+        try:
+            if self._source is None:
+                self._source = pygame.image.load(self.path)
+            if smooth:
+                img = pygame.transform.smoothscale(self._source, size)
+            else:
+                img = pygame.transform.scale(self._source, size)
+        except Exception as e:
+            print(f"{self.name}: не удалось загрузить заставку:", e)
+            self._failed = True
+            return None
+
+        if smooth:
+            self._fast.discard(size)
+            self._write_disk(cache_file, st, size, pygame.image.tostring(img, "RGB"))
+        else:
+            self._fast.add(size)
+        return self._convert(img)
+
+    @staticmethod
+    def _convert(img):
+        # без display-окна (окна _sdl2 в одном процессе) конвертировать не во что
+        if pygame.display.get_surface() is None:
+            return img
+        return img.convert()
+
+    @staticmethod
+    def _read_disk(cache_file, st, size):
+        try:
+            with open(cache_file, "rb") as f:
+                header = f.read(SPLASH_CACHE_HEADER.size)
+                if len(header) != SPLASH_CACHE_HEADER.size:
+                    return None
+                magic, mtime_ns, src_size, w, h = SPLASH_CACHE_HEADER.unpack(header)
+                if (magic != SPLASH_CACHE_MAGIC or mtime_ns != st.st_mtime_ns
+                        or src_size != st.st_size or (w, h) != size):
+                    return None
+                raw = f.read()
+        except OSError:
+            return None
+        if len(raw) != size[0] * size[1] * 3:
+            return None
+        return raw
+
+    def _write_disk(self, cache_file, st, size, raw):
+        # пишем во временный файл и переименовываем, чтобы второй процесс
+        # никогда не прочитал недописанный кэш
+        tmp = f"{cache_file}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(SPLASH_CACHE_HEADER.pack(SPLASH_CACHE_MAGIC, st.st_mtime_ns,
+                                                 st.st_size, size[0], size[1]))
+                f.write(raw)
+            os.replace(tmp, cache_file)
+        except OSError as e:
+            # каталог только для чтения — просто работаем без дискового кэша
+            print(f"{self.name}: не удалось сохранить кэш заставки:", e)
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+
+# ----------------------------------------------------------
+#   АТЛАС ФИГУР
+#   каждая комбинация фигура × цвет × размер рисуется один раз
+#   в отдельную поверхность с альфа-каналом, дальше кадр — это
+#   просто blit. Фигуры рисует draw (geometry.draw) сразу в нужном
+#   размере, без масштабирования спрайта. Заполняется лениво (или
+#   через warm()), размер ограничен: самые давно не использованные
+#   спрайты выбрасываются.
+# ----------------------------------------------------------
+class FigureAtlas:
+    def __init__(self, shapes, draw, max_sprites=64):
+        self.shapes = list(shapes)     # имена фигур
+        self.draw = draw               # draw(surface, shape, center, color, box)
+        self.max_sprites = max_sprites
+        self._sprites = OrderedDict()  # (shape, color, box) -> Surface
+        self._boxes = []               # размеры, которые уже запрашивали
+
+    def warm(self, colors, boxes=None):
+        # boxes=None — все размеры, в которых фигуры уже рисовались
+        for box in list(boxes or self._boxes):
+            for shape in self.shapes:
+                for color in colors:
+                    self.get(shape, color, box)
+
+    def get(self, shape, color, box):
+        key = (shape, tuple(color), box)
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            self._sprites.move_to_end(key)
+            return sprite
+
+        if box not in self._boxes:
+            self._boxes.append(box)
+        sprite = self._render(shape, key[1], box)
+        self._sprites[key] = sprite
+        if len(self._sprites) > self.max_sprites:
+            self._sprites.popitem(last=False)
+        return sprite
+
+    def blit(self, screen, shape, color, center, box):
+        sprite = self.get(shape, color, box)
+        return screen.blit(sprite, (center[0] - box // 2, center[1] - box // 2))
+
+    def _render(self, shape, color, box):
+        sprite = pygame.Surface((box, box), pygame.SRCALPHA)
+        self.draw(sprite, shape, (box // 2, box // 2), color, box)
+        if pygame.display.get_surface() is not None:
+            sprite = sprite.convert_alpha()
+        # RLE по альфе: прозрачные поля спрайта пропускаются при blit,
+        # иначе смешивание всего квадрата дороже прямой растеризации
+        sprite.set_alpha(255, pygame.RLEACCEL)
+        return sprite
+
+
+# ----------------------------------------------------------
+#   ЗАРАНЕЕ СОБРАННЫЕ КАДРЫ (back-buffer)
+#   окно собирает кадры следующих раундов во внеэкранных
+#   поверхностях формата экрана, пока ему нечего делать; смена
+#   раунда тогда — один blit. Ненужные кадры не выбрасываются,
+#   их поверхности идут под следующие (без новых аллокаций).
+# ----------------------------------------------------------
+class BackBuffers:
+    def __init__(self, screen):
+        self.screen = screen
+        self._frames = {}  # ключ кадра -> Surface
+        self._spare = []
+        self.hits = 0
+        self.composed = 0
+
+    def get(self, key):
+        frame = self._frames.get(key)
+        if frame is not None:
+            self.hits += 1
+        return frame
+
+    def keep(self, keys, compose):
+        # оставить кадры для keys, недостающие собрать: compose(surface, key)
+        for key in list(self._frames):
+            if key not in keys:
+                self._spare.append(self._frames.pop(key))
+        for key in keys:
+            if key not in self._frames:
+                surface = self._spare.pop() if self._spare else self.screen.copy()
+                compose(surface, key)
+                self._frames[key] = surface
+                self.composed += 1
+
+
+# ----------------------------------------------------------
+#   ШРИФТЫ И ТЕКСТ
+#   get_font() загружает каждый шрифт один раз на процесс,
+#   TextCache хранит уже отрендеренные надписи (LRU) —
+#   ключ (шрифт, текст, цвет, antialias).
+# ----------------------------------------------------------
+_fonts = {}
+
+
+def get_font(name, size):
+    key = (name, size)
+    font = _fonts.get(key)
+    if font is None:
+        font = _fonts[key] = pygame.font.SysFont(name, size)
+    return font
+
+
+class TextCache:
+    def __init__(self, max_items=128):
+        self.max_items = max_items
+        self._surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color, antialias=True):
+        key = (font, text, tuple(color), antialias)
+        surf = self._surfaces.get(key)
+        if surf is not None:
+            self.hits += 1
+            self._surfaces.move_to_end(key)
+            return surf
+
+        self.misses += 1
+        surf = self._surfaces[key] = font.render(text, antialias, color)
+        if len(self._surfaces) > self.max_items:
+            self._surfaces.popitem(last=False)
+        return surf
+
+
+if __name__ == "__main__":
+    # самопроверка кэшей на временных файлах, без окна
+    import tempfile
+
+    def pixel(surface):
+        # цвет заставки с точностью до канала (smoothscale чуть сдвигает значения)
+        return tuple(round(c / 255) for c in surface.get_at((5, 5))[:3])
+
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "1.png")
+        size = (40, 30)
+        pygame.image.save(pygame.Surface((80, 60)), path)  # чёрная заставка
+
+        # быстрый вариант (перегрев) на диск не пишется, сглаженный — пишется
+        splash = SplashCache(path)
+        assert splash.get(size, smooth=False) is not None
+        assert not os.path.exists(splash_cache_path(path, size))
+        assert splash.get(size) is not None
+        assert os.path.exists(splash_cache_path(path, size))
+
+        # холодный старт: пиксели с диска, PNG не декодируется
+        cold = SplashCache(path)
+        assert pixel(cold.get(size)) == (0, 0, 0) and cold._source is None
+
+        # исходник поменялся (mtime) — кэш пересобирается из PNG
+        st = os.stat(path)
+        red = pygame.Surface((80, 60))
+        red.fill((255, 0, 0))
+        pygame.image.save(red, path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+        stale = SplashCache(path)
+        assert pixel(stale.get(size)) == (1, 0, 0) and stale._source is not None
+        assert pixel(SplashCache(path).get(size)) == (1, 0, 0)
+
+        # поменялся только размер файла (mtime тот же) — тоже пересборка
+        st = os.stat(path)
+        green = pygame.Surface((120, 90))
+        green.fill((0, 255, 0))
+        pygame.image.save(green, path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        assert os.stat(path).st_size != st.st_size
+        resized = SplashCache(path)
+        assert pixel(resized.get(size)) == (0, 1, 0) and resized._source is not None
+
+    # атлас: повторный запрос — без рисования, размер не больше max_sprites,
+    # выбрасывается самый давно не использованный спрайт
+    drawn = []
+
+    def draw(surface, shape, center, color, box):
+        drawn.append((shape, color, box))
+        pygame.draw.circle(surface, color, center, box // 2)
+
+    shapes = ["circle", "square", "triangle", "hexagon", "cross"]
+    colors = [(255, 0, 0), (0, 160, 0), (0, 0, 255), (255, 200, 0)]
+    atlas = FigureAtlas(shapes, draw)
+    first = atlas.get("circle", colors[0], 10)
+    assert atlas.get("circle", [255, 0, 0], 10) is first and len(drawn) == 1
+    for box in range(11, 15):  # 1 + 4 размера × 20 = 81 спрайт > 64
+        atlas.warm(colors, [box])
+        atlas.get("circle", colors[0], 10)  # самый первый всё время в ходу
+    assert len(atlas._sprites) == atlas.max_sprites == 64 and len(drawn) == 81
+    assert atlas.get("circle", colors[0], 10) is first and len(drawn) == 81
+    atlas.get("square", colors[0], 11)  # давно не нужен — выброшен, рисуется снова
+    assert len(drawn) == 82 and len(atlas._sprites) == 64
+    atlas.warm(colors)  # все размеры, что уже запрашивали
+    assert len(atlas._sprites) == 64
+
+    # надписи: шрифт грузится один раз, счётчики — на попадание и промах
+    pygame.font.init()
+    font = get_font(None, 24)
+    assert get_font(None, 24) is font
+    texts = TextCache(max_items=3)
+    label = texts.render(font, "CPU: 55.0°C", (0, 0, 0))
+    assert (texts.hits, texts.misses) == (0, 1)
+    assert texts.render(font, "CPU: 55.0°C", [0, 0, 0]) is label
+    assert (texts.hits, texts.misses) == (1, 1)
+    texts.render(font, "CPU: 55.0°C", (255, 0, 0))  # другой цвет — другая надпись
+    texts.render(font, "CPU: 55.0°C", (0, 0, 0), antialias=False)
+    assert (texts.hits, texts.misses) == (1, 3)
+    texts.render(font, "CPU: 56.0°C", (0, 0, 0))  # четвёртая — выбрасывает самую старую
+    assert len(texts._surfaces) == 3
+    assert texts.render(font, "CPU: 55.0°C", (255, 0, 0)) is not None
+    assert (texts.hits, texts.misses) == (2, 4)
+    texts.render(font, "CPU: 55.0°C", (0, 0, 0))
+    assert (texts.hits, texts.misses) == (2, 5)
+    print("render_cache: ok")
@@ -0,0 +1,413 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import types
+import zlib
+from multiprocessing.connection import wait
+
+from bench_displays import FORK, HERE, load_script
+
+# ----------------------------------------------------------
+#   ПРОИГРЫВАНИЕ ЗАПИСАННОЙ СЕССИИ БЕЗ ЭКРАНОВ (SDL dummy)
+#   Лог session_log.py подаётся в настоящие dsi_window/hdmi_window:
+#   тапы — событиями pygame в окно DSI, решения main — публикацией
+#   в общую память и WAKE, как это делал main. Между записями не
+#   спим (или --speed X — в X раз быстрее записи), следующий шаг —
+#   как только все окна обработали предыдущий.
+#
+#   Проверяется:
+#     - раунды лога совпадают с колодой его seed;
+#     - DSI на те же тапы шлёт те же START/REFRESH (с теми же id);
+#     - после каждой публикации каждое окно показывает её режим и фигуры;
+#     - кадры (crc32 экрана) совпадают с эталоном (--expect, пишется --save).
+#   Печатает время кадра и задержку "шаг -> кадр на экране" по окнам
+#   (после тапа — от тапа, у всех окон) и разброс смены раунда между
+#   окнами (PRESENTED).
+#
+#   python replay_session.py [--speed X] [--save F] [--expect F] лог.session [скрипт.py]
+#   python replay_session.py --synthetic N [скрипт.py]  — сессия из N раундов без лога
+# ----------------------------------------------------------
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+import session_log
+
+STEP_TIMEOUT = 10  # сек на ответ окна, дольше — расхождение
+
+
+# ---------------- внутри процесса окна ----------------
+class Player:
+    # подменяет в процессе окна: run_window (запомнить view), event.wait
+    # (окно обработало всё, что было, — отчёт "idle" с тем, что оно
+    # показывает), display.update/flip (кадр ушёл на экран — crc и время)
+    def __init__(self, control):
+        self.control = control  # pipe к replay: отчёты туда, тапы оттуда
+        self.view = None
+        self.woke = time.monotonic()
+
+    def install(self, game):
+        player = self
+        orig_run, orig_wait = game.run_window, pygame.event.wait
+        orig_update, orig_flip = pygame.display.update, pygame.display.flip
+
+        def run_window(view):
+            player.view = view
+            threading.Thread(target=player.feed, daemon=True).start()
+            orig_run(view)
+
+        def wait_event(timeout=0):
+            view = player.view
+            # present_at ещё не сброшен — нарисованный кадр ждёт вывода
+            player.control.send(("idle", view.seen_seq, view.mode, view.figures,
+                                 bool(view.present_at)))
+            event = orig_wait(timeout)
+            player.woke = time.monotonic()
+            return event
+
+        def presented():
+            now = time.monotonic()
+            crc = zlib.crc32(pygame.image.tobytes(pygame.display.get_surface(), "RGB"))
+            player.control.send(("frame", now, now - player.woke, crc))
+
+        def update(*args):
+            orig_update(*args)
+            presented()
+
+        def flip():
+            orig_flip()
+            presented()
+
+        game.run_window = run_window
+        # кнопка SHUTDOWN в логе не должна выключать машину
+        game.subprocess = types.SimpleNamespace(
+            call=lambda args: player.control.send(("shutdown",)))
+        pygame.event.wait = wait_event
+        pygame.display.update = update
+        pygame.display.flip = flip
+
+    def feed(self):
+        # тапы из лога — в очередь событий окна (post потокобезопасен)
+        while True:
+            try:
+                pos, button = self.control.recv()
+            except (EOFError, OSError):
+                return
+            pygame.event.post(pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=pos, button=button))
+
+
+def run_window(game, control, sysfs_root, target, *args):
+    # температура не читается (пустое дерево sysfs) — надпись на DSI не плавает
+    game.SYSFS_ROOT = sysfs_root
+    Player(control).install(game)
+    try:
+        target(*args)
+    except SystemExit:
+        pass
+
+
+# ---------------- replay: роль main ----------------
+class Window:
+    def __init__(self, display, conn, control, proc):
+        self.display = display
+        self.conn = conn        # pipe протокола игры
+        self.control = control  # pipe Player
+        self.proc = proc
+        self.idle = None        # (seq, mode, figures, ждёт вывода) из последнего отчёта
+        self.frames = []        # (время, работа кадра, crc)
+        self.latencies = []     # шаг -> первый кадр после него
+        self.waiting_since = None
+        self.requests = []      # START/REFRESH от DSI, ещё не сверенные с логом
+        self.shut_down = False
+
+
+class Replay:
+    def __init__(self, game, records, sysfs_root, deck):
+        self.game = game
+        self.records = records
+        self.deck = deck  # колода seed лога: по ней публикуются следующие раунды
+        self.sysfs_root = sysfs_root
+        self.colors = [game.NATURAL_COLORS[f] for f in game.FIGURE_ORDER]
+        self.state = game.RoundState(game.FIGURE_ORDER, self.colors)
+        self.windows = []
+        self.problems = []
+        self.flips = {}  # seq публикации -> {окно: момент кадра} (PRESENTED)
+
+    def start(self, screen):
+        game = self.game
+        for display in game.DISPLAYS:
+            controller = display.role == "controller"
+            size = (screen if controller else None) or display.size
+            display = display._replace(pos="0,0", size=size)
+            target = game.dsi_window if controller else game.hdmi_window
+            conn, child_conn = FORK.Pipe()
+            control, child_control = FORK.Pipe()
+            proc = FORK.Process(target=run_window, daemon=True,
+                           args=(game, child_control, self.sysfs_root, target,
+                                 child_conn, self.state, display))
+            proc.start()
+            self.windows.append(Window(display, conn, control, proc))
+        self.all_windows = list(self.windows)  # windows — только ещё живые
+        self.dsi = next(w for w in self.windows if w.display.role == "controller")
+
+    def pump(self, timeout):
+        # разобрать всё, что прислали окна
+        by_conn = {}
+        for window in self.windows:
+            by_conn[window.conn] = window
+            by_conn[window.control] = window
+        for conn in wait(list(by_conn), timeout):
+            window = by_conn[conn]
+            try:
+                if conn is window.conn:
+                    msg = self.game.CODEC.recv(conn)
+                    if msg.kind in (self.game.protocol.START, self.game.protocol.REFRESH):
+                        window.requests.append(msg)
+                    elif msg.kind == self.game.protocol.PRESENTED:
+                        self.flips.setdefault(msg.round_id, {})[window] = msg.t0
+                    continue
+                report = conn.recv()
+            except (EOFError, OSError):
+                # окно завершилось (EOF приходит по обоим pipe)
+                if window in self.windows:
+                    self.windows.remove(window)
+                continue
+            if report[0] == "idle":
+                window.idle = report[1:]
+            elif report[0] == "frame":
+                window.frames.append(report[1:])
+                if window.waiting_since is not None:
+                    window.latencies.append(report[1] - window.waiting_since)
+                    window.waiting_since = None
+            elif report[0] == "shutdown":
+                window.shut_down = True
+
+    def wait_for(self, what, done):
+        deadline = time.monotonic() + STEP_TIMEOUT
+        while not done():
+            left = deadline - time.monotonic()
+            if left <= 0 or not self.windows:
+                self.problems.append(f"не дождались: {what}")
+                return False
+            self.pump(left)
+        return True
+
+    def settled(self, seq):
+        return all(w.idle is not None and w.idle[0] >= seq and not w.idle[3]
+                   for w in self.windows)
+
+    def publish_state(self, record):
+        # как publish_round в main: вместе с раундом — фигуры следующих
+        game = self.game
+        upcoming = [self.deck[record.round_id + i].figures for i in range(1, game.UPCOMING + 1)]
+        present_at = time.monotonic() + game.PRESENT_LEAD if game.PRESENT_LEAD else 0.0
+        self.state.publish(record.mode, record.round_id, record.figures, record.req_id,
+                           record.level, upcoming, present_at)
+
+    def publish(self, record):
+        game = self.game
+        self.publish_state(record)
+        now = time.monotonic()
+        for window in self.windows:
+            if window.waiting_since is None:  # после тапа задержку считаем от него
+                window.waiting_since = now
+            try:
+                game.CODEC.send(window.conn, game.protocol.WAKE)
+            except OSError:
+                pass
+        seq = self.state.seq
+        if not self.wait_for(f"раунд {record.round_id}", lambda: self.settled(seq)):
+            return
+        for window in self.windows:
+            _, mode, figures, _ = window.idle
+            if (mode, figures) != (record.mode, record.figures):
+                self.problems.append(f"{window.display.name}, раунд {record.round_id}: "
+                                     f"показано {mode} {figures}, в логе {record.mode} {record.figures}")
+            # публикация ничего не поменяла на экране — кадра и не будет
+            window.waiting_since = None
+
+    def request(self, record):
+        protocol = self.game.protocol
+        kind = protocol.START if record.kind == session_log.START else protocol.REFRESH
+        dsi = self.dsi
+        name = "START" if kind == protocol.START else f"REFRESH {record.req_id}"
+        if not self.wait_for(name, lambda: dsi.requests or dsi not in self.windows):
+            return
+        if dsi not in self.windows:
+            return
+        msg = dsi.requests.pop(0)
+        if msg.kind != kind or (kind == protocol.REFRESH and msg.req_id != record.req_id):
+            self.problems.append(f"DSI прислал {msg.kind}/{msg.req_id}, в логе {name}")
+
+    def run(self, speed=0.0):
+        records = self.records
+        first = records[0]
+        self.publish_state(first)
+        screen = next((r.pos for r in records if r.kind == session_log.SCREEN), None)
+        self.start(screen)
+        seq = self.state.seq
+        self.wait_for("первый кадр всех окон", lambda: self.settled(seq))
+
+        started = time.monotonic()
+        for record in records[1:]:
+            if speed:
+                delay = started + (record.time - first.time) / speed - time.monotonic()
+                if delay > 0:
+                    self.pump(delay)
+            if record.kind == session_log.TOUCH:
+                if self.dsi in self.windows:
+                    # тап -> кадр: для всех окон, не только для DSI
+                    now = time.monotonic()
+                    for window in self.windows:
+                        window.waiting_since = now
+                    self.dsi.control.send((record.pos, record.button))
+            elif record.kind in (session_log.START, session_log.REFRESH):
+                self.request(record)
+            elif record.kind == session_log.PUBLISH:
+                self.publish(record)
+            self.pump(0)
+        elapsed = time.monotonic() - started
+
+        for window in list(self.windows):
+            try:
+                self.game.CODEC.send(window.conn, self.game.protocol.QUIT)
+            except OSError:
+                pass
+        while self.windows:
+            self.pump(5)
+        for window in self.all_windows:
+            window.proc.join(timeout=5)
+        self.state.close()
+        return elapsed
+
+    def skews(self):
+        # разброс смены раунда между окнами — по публикациям, что сменили кадр у всех
+        count = len(self.all_windows)
+        return [max(shown.values()) - min(shown.values())
+                for shown in self.flips.values() if len(shown) == count]
+
+
+def make_session(game, path, rounds, seed=1):
+    # синтетическая сессия: старт, rounds тапов refresh, в середине — перегрев
+    colors = [game.NATURAL_COLORS[f] for f in game.FIGURE_ORDER]
+    log = session_log.SessionLog(path, game.FIGURE_ORDER, colors, seed)
+    deck = game.RoundDeck(game.ROUNDS, seed)
+    width, height = 800, 480
+    log.publish("splash", 1, deck[1].figures)
+    log.screen((width, height))
+    log.touch((width // 2, height // 2))
+    log.request(session_log.START)
+    log.publish("game", 1, deck[1].figures)
+    level = 0
+    for i in range(1, rounds + 1):
+        if i == rounds // 2:
+            level = len(game.THERMAL_LEVELS) - 1
+            log.publish("game", i, deck[i].figures, i - 1, level)
+        log.touch((width // 2, height - 80))
+        log.request(session_log.REFRESH, i)
+        log.publish("game", i + 1, deck[i + 1].figures, i, level)
+    log.close()
+
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def distinct_frames(frames):
+    # подряд одинаковые кадры (перерисовка без изменений) — один кадр
+    crcs = []
+    for _, _, crc in frames:
+        if not crcs or crcs[-1] != crc:
+            crcs.append(crc)
+    return crcs
+
+
+def main():
+    args = sys.argv[1:]
+    options = {"--speed": "0", "--save": None, "--expect": None, "--synthetic": None}
+    while args and args[0] in options:
+        options[args[0]] = args[1]
+        args = args[2:]
+    # у --synthetic лога нет — первый аргумент уже скрипт
+    scripts = args if options["--synthetic"] else args[1:]
+    script = scripts[0] if scripts else os.path.join(HERE, "6LAST.py")
+    game = load_script(script)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if options["--synthetic"]:
+            path = os.path.join(tmp, "synthetic.session")
+            make_session(game, path, int(options["--synthetic"]))
+        elif args:
+            path = args[0]
+        else:
+            print("python replay_session.py [--speed X] [--save F] [--expect F] "
+                  "лог.session [скрипт.py] | --synthetic N [скрипт.py]")
+            sys.exit(2)
+
+        colors = [game.NATURAL_COLORS[f] for f in game.FIGURE_ORDER]
+        seed, records = session_log.read_session(path, game.FIGURE_ORDER, colors)
+        deck = game.RoundDeck(game.ROUNDS, seed)
+        replay = Replay(game, records, tmp, deck)
+        publishes = [r for r in records if r.kind == session_log.PUBLISH]
+        if not publishes or records[0].kind != session_log.PUBLISH:
+            print(f"{path}: лог не начинается с публикации состояния")
+            sys.exit(2)
+        for r in publishes:
+            if r.figures != list(deck[r.round_id].figures):
+                replay.problems.append(f"раунд {r.round_id}: в логе {r.figures}, "
+                                       f"в колоде seed {seed} {deck[r.round_id].figures}")
+
+        elapsed = replay.run(float(options["--speed"]))
+
+    recorded = records[-1].time - records[0].time
+    taps = sum(r.kind == session_log.TOUCH for r in records)
+    print(f"{os.path.basename(path)}: seed {seed}, записей {len(records)}, тапов {taps}, "
+          f"раундов {len(publishes)}")
+    print(f"записано за {recorded:.2f} с, проиграно за {elapsed:.2f} с"
+          + (f" (в {recorded / elapsed:.0f} раз быстрее)" if elapsed and recorded > elapsed else ""))
+    print("  окно        кадров  работа p50/p95/макс мс   шаг -> кадр p50/p95/макс мс")
+    frames = {}
+    for window in replay.all_windows:
+        name = window.display.name
+        frames[name] = distinct_frames(window.frames)
+        busy = sorted(b * 1000 for _, b, _ in window.frames) or [0]
+        late = sorted(t * 1000 for t in window.latencies) or [0]
+        print(f"  {name:10s} {len(window.frames):7d}  "
+              f"{percentile(busy, 0.5):6.2f} {percentile(busy, 0.95):6.2f} {busy[-1]:6.2f}"
+              f"          {percentile(late, 0.5):6.2f} {percentile(late, 0.95):6.2f} {late[-1]:6.2f}"
+              f"   crc {zlib.crc32(json.dumps(frames[name]).encode()):08x}")
+        if window.shut_down:
+            print(f"  {name}: в логе нажат SHUTDOWN (машина не выключалась)")
+
+    if options["--save"]:
+        with open(options["--save"], "w") as f:
+            json.dump(frames, f)
+    if options["--expect"]:
+        with open(options["--expect"]) as f:
+            expected = json.load(f)
+        for name, crcs in expected.items():
+            got = frames.get(name, [])
+            if got != crcs:
+                at = next((i for i, (a, b) in enumerate(zip(got, crcs)) if a != b),
+                          min(len(got), len(crcs)))
+                replay.problems.append(f"{name}: кадры расходятся с эталоном с кадра {at} "
+                                       f"(кадров {len(got)}, в эталоне {len(crcs)})")
+
+    skews = sorted(t * 1000 for t in replay.skews())
+    if skews:
+        print(f"  смена раунда на всех экранах ({len(skews)}): разброс p50 "
+              f"{percentile(skews, 0.5):.2f} мс, p95 {percentile(skews, 0.95):.2f} мс, "
+              f"макс {skews[-1]:.2f} мс")
+
+    for problem in replay.problems:
+        print("  расхождение:", problem)
+    print("совпадает" if not replay.problems else f"расхождений: {len(replay.problems)}")
+    sys.exit(1 if replay.problems else 0)
+
+
+if __name__ == "__main__":
+    main()
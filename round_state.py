@@ -0,0 +1,203 @@
+import struct
+import zlib
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+# ----------------------------------------------------------
+#   ОБЩЕЕ СОСТОЯНИЕ РАУНДА (shared memory)
+#   main пишет сюда режим, id раунда, индексы фигур/цветов и уровень
+#   термо-регулятора, все окна читают без pickle и без pipe.
+#   Сколько бы ни было дисплеев, рассылка — это одна запись в память.
+#   Вместе с раундом main публикует фигуры UPCOMING следующих —
+#   окна заранее собирают их кадры во внеэкранных поверхностях.
+#   present_at — момент (time.monotonic, часы общие для процессов),
+#   когда публикацию показать: все экраны меняют раунд в первом
+#   кадре после него, а не каждый, как только прочитал.
+#
+#   Защита от "рваного" чтения — счётчик последовательности
+#   (seqlock): перед записью main делает seq нечётным, после —
+#   снова чётным. Читатель повторяет чтение, если seq нечётный
+#   или поменялся за время чтения.
+#
+#   Барьеров памяти из Python не поставить, а ядра ARM на Pi могут
+#   увидеть записи другого процесса не в том порядке, в каком их
+#   сделали (например, чётный seq раньше данных). Поэтому в самой
+#   публикации лежат её seq и crc32: читатель берёт копию блока
+#   целиком и принимает её, только если seq в заголовке и в
+#   публикации совпадают, чётные и crc сходится, — при любом порядке
+#   записей рваная копия не пройдёт. Блокировка не годится: окно,
+#   остановленное или убитое посреди чтения (сторож), держало бы её
+#   и main не смог бы публиковать.
+# ----------------------------------------------------------
+SEQ = struct.Struct("<I")
+# сколько следующих раундов публикуется заранее
+UPCOMING = 2
+# mode, уровень термо-регулятора, round_id, req_id (id запроса refresh от DSI),
+# present_at, shape0, color0, shape1, color1, затем то же для каждого следующего раунда
+PAYLOAD = struct.Struct("<BBIId4B" + "4B" * UPCOMING)
+# публикация: её seq, PAYLOAD и crc32 их обоих
+BODY = struct.Struct("<I" + PAYLOAD.format[1:])
+CRC = struct.Struct("<I")
+SIZE = SEQ.size + BODY.size + CRC.size
+
+MODES = ("splash", "game")
+NO_FIGURES = (0xFF, 0xFF, 0xFF, 0xFF)
+
+# upcoming — фигуры следующих раундов (может быть короче UPCOMING),
+# present_at — 0.0, если показать сразу
+RoundSnapshot = namedtuple("RoundSnapshot",
+                           "seq mode round_id req_id figures level upcoming present_at")
+
+
+class RoundState:
+    def __init__(self, shapes, colors, name=None):
+        # shapes / colors — общие для всех процессов таблицы,
+        # в памяти лежат только индексы в них
+        self.shapes = list(shapes)
+        self.colors = [tuple(c) for c in colors]
+        if name is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=SIZE)
+            self._owner = True
+            # до первой публикации блок читается как нулевая публикация seq 0
+            body = bytes(BODY.size)
+            self._shm.buf[:SIZE] = bytes(SEQ.size) + body + CRC.pack(zlib.crc32(body))
+        else:
+            # окна — дочерние процессы main и делят с ним resource_tracker,
+            # поэтому блок удалит только main (close() у владельца)
+            self._shm = shared_memory.SharedMemory(name=name)
+            self._owner = False
+        self._buf = self._shm.buf
+        self._seq = SEQ.unpack_from(self._buf, 0)[0]
+
+    # при передаче в Process (spawn/forkserver) окно подключается к тому же блоку
+    def __reduce__(self):
+        return (RoundState, (self.shapes, self.colors, self._shm.name))
+
+    @property
+    def seq(self):
+        return SEQ.unpack_from(self._buf, 0)[0]
+
+    def publish(self, mode, round_id, figures, req_id=0, level=0, upcoming=(), present_at=0.0):
+        payload = (MODES.index(mode), level, round_id, req_id, present_at,
+                   *self._indices(figures))
+        upcoming = list(upcoming)[:UPCOMING]
+        for figs in upcoming:
+            payload += self._indices(figs)
+        payload += NO_FIGURES * (UPCOMING - len(upcoming))
+        seq = self._seq + 2
+        body = BODY.pack(seq, *payload)
+        SEQ.pack_into(self._buf, 0, seq - 1)        # нечётный — идёт запись
+        self._buf[SEQ.size:SIZE] = body + CRC.pack(zlib.crc32(body))
+        SEQ.pack_into(self._buf, 0, seq)            # чётный — запись закончена
+        self._seq = seq
+
+    def read(self):
+        while True:
+            data = bytes(self._buf[:SIZE])  # одна копия — дальше разбирается только она
+            seq = SEQ.unpack_from(data, 0)[0]
+            body = data[SEQ.size:SEQ.size + BODY.size]
+            if seq & 1 or BODY.unpack_from(body, 0)[0] != seq:
+                continue
+            if CRC.unpack_from(data, SEQ.size + BODY.size)[0] == zlib.crc32(body):
+                break
+        _, mode, level, round_id, req_id, present_at, *indices = BODY.unpack(body)
+        rounds = [self._figures(indices[i:i + 4]) for i in range(0, len(indices), 4)]
+        upcoming = [figs for figs in rounds[1:] if figs is not None]
+        return RoundSnapshot(seq, MODES[mode], round_id, req_id, rounds[0], level, upcoming,
+                             present_at)
+
+    def _indices(self, figures):
+        (s0, c0), (s1, c1) = figures
+        return (self.shapes.index(s0), self.colors.index(tuple(c0)),
+                self.shapes.index(s1), self.colors.index(tuple(c1)))
+
+    def _figures(self, indices):
+        s0, c0, s1, c1 = indices
+        if s0 == 0xFF:
+            return None
+        return [(self.shapes[s0], self.colors[c0]), (self.shapes[s1], self.colors[c1])]
+
+    def close(self):
+        self._buf = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+if __name__ == "__main__":
+    # самопроверка: писатель в отдельном процессе публикует без пауз,
+    # читатель проверяет, что каждый снимок целиком из одной публикации
+    import multiprocessing
+    import threading
+    import time
+
+    SHAPES = ["circle", "square", "triangle", "hexagon", "cross"]
+    COLORS = [(255, 0, 0), (0, 160, 0), (0, 0, 255), (255, 200, 0)]
+    WRITES = 200000
+
+    def figures(i):
+        return [(SHAPES[i % 5], COLORS[i % 4]), (SHAPES[(i + 2) % 5], COLORS[(i + 1) % 4])]
+
+    def publish(state, i):
+        # все поля выводятся из i — по любому из них видно, из какой публикации
+        state.publish(MODES[i % 2], i, figures(i), req_id=i * 3, level=i % 3,
+                      upcoming=[figures(i + 1), figures(i + 2)], present_at=i / 8)
+
+    def check(snap):
+        i = snap.round_id
+        assert (snap.mode, snap.req_id, snap.level, snap.present_at) == \
+            (MODES[i % 2], i * 3, i % 3, i / 8), snap
+        assert snap.figures == figures(i) and snap.upcoming == [figures(i + 1), figures(i + 2)], snap
+
+    def writer(state):
+        for i in range(1, WRITES + 1):
+            publish(state, i)
+
+    state = RoundState(SHAPES, COLORS)
+    assert state.read().seq == 0  # до первой публикации
+    proc = multiprocessing.get_context("fork").Process(target=writer, args=(state,))
+    proc.start()
+    reads = distinct = 0
+    last = 0
+    while proc.is_alive() or last < WRITES:
+        snap = state.read()
+        reads += 1
+        if snap.round_id == 0:
+            continue
+        check(snap)
+        assert snap.round_id >= last and snap.seq == snap.round_id * 2, snap
+        distinct += snap.round_id != last
+        last = snap.round_id
+    proc.join()
+    assert proc.exitcode == 0
+
+    # рваный блок (данные одной публикации, seq другой) читатель не принимает:
+    # read() ждёт, пока поток не допишет публикацию целиком
+    publish(state, 7)
+    intact = bytes(state._buf[:SIZE])
+    state._buf[SEQ.size + 10] ^= 0xFF
+    fixed_at = []
+
+    def repair():
+        time.sleep(0.05)
+        fixed_at.append(time.monotonic())
+        state._buf[:SIZE] = intact
+
+    threading.Thread(target=repair).start()
+    snap = state.read()
+    assert fixed_at and time.monotonic() >= fixed_at[0], "рваный блок принят"
+    check(snap)
+
+    reps = 100000
+    t = time.perf_counter()
+    for i in range(reps):
+        publish(state, i)
+    per_publish = (time.perf_counter() - t) / reps * 1e6
+    t = time.perf_counter()
+    for _ in range(reps):
+        state.read()
+    per_read = (time.perf_counter() - t) / reps * 1e6
+    state.close()
+    print(f"round_state: ok, {reads} чтений под запись из другого процесса "
+          f"({distinct} разных публикаций), publish {per_publish:.2f} мкс, "
+          f"read {per_read:.2f} мкс")
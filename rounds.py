@@ -0,0 +1,149 @@
+import random
+from collections import namedtuple
+
+# ----------------------------------------------------------
+#   ТАБЛИЦА РАУНДОВ И КОЛОДА
+#   Все допустимые раунды (две фигуры не своего цвета, цвета разные)
+#   перечисляются один раз вместе с правильным ответом. Дальше
+#   выбор раунда и поиск ответа — обращение по индексу/словарю.
+#
+#   Колода — таблица, перемешанная от seed. Раунды идут по колоде
+#   без повторов, пока она не кончится, потом — новая перетасовка
+#   (первый раунд новой колоды не совпадает с последним старой).
+#   Номер раунда однозначно задаёт позицию в колоде, поэтому при
+#   том же seed любой процесс восстановит фигуры по одному round_id.
+# ----------------------------------------------------------
+# figures — [(фигура, цвет), (фигура, цвет)], correct — (фигура, её цвет)
+Round = namedtuple("Round", "figures correct")
+
+
+class RoundTable:
+    def __init__(self, figure_order, natural_colors):
+        self.figure_order = list(figure_order)
+        self.natural_colors = {shape: tuple(natural_colors[shape]) for shape in self.figure_order}
+        rounds = []
+        colors = [self.natural_colors[shape] for shape in self.figure_order]
+        for s0 in self.figure_order:
+            for s1 in self.figure_order:
+                if s1 == s0:
+                    continue
+                for c0 in colors:
+                    if c0 == self.natural_colors[s0]:
+                        continue
+                    for c1 in colors:
+                        if c1 == self.natural_colors[s1] or c1 == c0:
+                            continue
+                        figures = ((s0, c0), (s1, c1))
+                        rounds.append(Round(figures, self._correct(figures)))
+        self.rounds = tuple(rounds)
+        self._index = {r.figures: i for i, r in enumerate(self.rounds)}
+
+    def __len__(self):
+        return len(self.rounds)
+
+    def __getitem__(self, index):
+        return self.rounds[index]
+
+    def index(self, figures):
+        return self._index[tuple((shape, tuple(color)) for shape, color in figures)]
+
+    def correct(self, figures):
+        return self.rounds[self.index(figures)].correct
+
+    def _correct(self, figures):
+        # первая фигура по FIGURE_ORDER, которой нет среди показанных и чьего
+        # цвета нет на экране; если такой нет — просто первая непоказанная
+        used_shapes = {shape for shape, _ in figures}
+        used_colors = {color for _, color in figures}
+        for shape in self.figure_order:
+            if shape not in used_shapes and self.natural_colors[shape] not in used_colors:
+                return shape, self.natural_colors[shape]
+        for shape in self.figure_order:
+            if shape not in used_shapes:
+                return shape, self.natural_colors[shape]
+        return self.figure_order[0], self.natural_colors[self.figure_order[0]]
+
+
+class RoundDeck:
+    def __init__(self, table, seed):
+        self.table = table
+        self.seed = seed
+        # порядок (индексы в таблице) двух последних колод: main смотрит
+        # на несколько раундов вперёд, и на стыке нужны обе
+        self._orders = {}
+
+    def __getitem__(self, round_id):
+        # round_id с 1: раунды 1..N — первая колода, N+1..2N — вторая и т.д.
+        epoch, position = divmod(round_id - 1, len(self.table))
+        order = self._orders.get(epoch)
+        if order is None:
+            order = self._shuffled(epoch)
+            self._orders = {e: o for e, o in self._orders.items() if abs(e - epoch) == 1}
+            self._orders[epoch] = order
+        return self.table[order[position]]
+
+    def _raw(self, epoch):
+        # перетасовка колоды epoch до поправки на стык
+        order = list(range(len(self.table)))
+        random.Random(f"{self.seed}/{epoch}").shuffle(order)
+        return order
+
+    def _shuffled(self, epoch):
+        if epoch > 0 and len(self.table) == 2:
+            # из двух раундов после стыка колода всегда идёт в порядке первой
+            return self._raw(0)
+        order = self._raw(epoch)
+        if epoch > 0 and len(order) > 1:
+            # стык колод: первый раунд не повторяет последний предыдущей.
+            # Поправка меняет только позиции 0 и 1, поэтому последний раунд
+            # предыдущей колоды (N > 2) — из её исходной перетасовки: любой
+            # round_id — две перетасовки, без цепочки колод до него
+            previous = self._orders.get(epoch - 1) or self._raw(epoch - 1)
+            if order[0] == previous[-1]:
+                order[0], order[1] = order[1], order[0]
+        return order
+
+
+if __name__ == "__main__":
+    # самопроверка на наборе фигур из 6LAST.py
+    import time
+
+    natural = {"circle": (255, 165, 0), "hexagon": (200, 0, 200), "triangle": (0, 200, 0),
+               "cross": (0, 128, 255), "square": (255, 0, 0)}
+    table = RoundTable(natural, natural)
+
+    for i, (figures, correct) in enumerate(table.rounds):
+        (s0, c0), (s1, c1) = figures
+        assert s0 != s1 and c0 != c1
+        assert c0 != natural[s0] and c1 != natural[s1]
+        assert correct[0] not in (s0, s1) and correct[1] == natural[correct[0]]
+        assert table.index([list(f) for f in figures]) == i
+    assert len(set(r.figures for r in table.rounds)) == len(table)
+
+    deck = RoundDeck(table, seed=1234)
+    n = len(table)
+    ids = [table.index(deck[round_id].figures) for round_id in range(1, 10 * n + 1)]
+    for epoch in range(10):
+        assert sorted(ids[epoch * n:(epoch + 1) * n]) == list(range(n))
+    assert all(a != b for a, b in zip(ids, ids[1:]))
+
+    # другой процесс с тем же seed — те же раунды, в любом порядке запросов
+    other = RoundDeck(table, seed=1234)
+    for round_id in (5 * n + 1, 3, 7 * n, 2 * n + 1):
+        assert other[round_id] == deck[round_id]
+    assert [RoundDeck(table, 99)[r] for r in range(1, n + 1)] != [deck[r] for r in range(1, n + 1)]
+
+    # далёкая колода без кэша соседних: то же, что и подряд, и стык соблюдён
+    for epoch in (5000, 2 ** 31 // n - 1):
+        cold = RoundDeck(table, seed=1234)
+        first, last = cold[epoch * n + 1], cold[epoch * n]
+        warm = RoundDeck(table, seed=1234)
+        assert warm[epoch * n] == last and warm[epoch * n + 1] == first and first != last
+    assert RoundDeck(table, seed=1234)[2 ** 31 - 1] in table.rounds
+
+    reps = 100000
+    t = time.perf_counter()
+    for round_id in range(1, reps + 1):
+        deck[round_id]
+    per_round = (time.perf_counter() - t) / reps * 1e6
+    print(f"rounds: ok, {len(table)} раундов в таблице, {per_round:.2f} мкс на раунд из колоды")
@@ -0,0 +1,168 @@
+import os
+import struct
+import time
+from collections import namedtuple
+
+# ----------------------------------------------------------
+#   ЗАПИСЬ СЕССИИ (append-only лог)
+#   В файл сессии пишутся все решения main (каждая публикация
+#   состояния: режим, раунд, id ответа на refresh, термо-уровень,
+#   фигуры), полученные им запросы START/REFRESH и каждый тап на
+#   DSI. Заголовок файла хранит seed колоды, у каждой записи —
+#   время CLOCK_MONOTONIC (часы общие для всех процессов).
+#
+#   Запись — struct фиксированного размера, одна os.write на
+#   файле с O_APPEND: main и окно DSI пишут в один файл, и записи
+#   не перемешиваются. Фигуры — индексы в общих таблицах, как в
+#   round_state.py. Проиграть лог — replay_session.py.
+# ----------------------------------------------------------
+MAGIC = b"FSES"
+VERSION = 1
+# magic, версия, seed колоды
+HEADER = struct.Struct("<4sBQ")
+# время, тип, режим, термо-уровень, кнопка мыши, round_id, req_id,
+# x, y (тап или размер экрана), shape0, color0, shape1, color1
+RECORD = struct.Struct("<dBBBBIIHH4B")
+
+# типы записей
+PUBLISH = 1  # main опубликовал состояние раунда
+START = 2    # main получил START (req_id — 0)
+REFRESH = 3  # main получил REFRESH с req_id
+TOUCH = 4    # DSI: тап в pos
+SCREEN = 5   # DSI: размер экрана в pos (первой записью окна)
+KINDS = (PUBLISH, START, REFRESH, TOUCH, SCREEN)
+
+MODES = ("splash", "game")
+NO_FIGURES = (0xFF, 0xFF, 0xFF, 0xFF)
+
+# figures — None или [(фигура, цвет), (фигура, цвет)], mode — None у записей без режима
+Record = namedtuple("Record", "time kind mode level button round_id req_id pos figures")
+
+
+class SessionError(ValueError):
+    pass
+
+
+class SessionLog:
+    def __init__(self, path, shapes, colors, seed=None):
+        # seed задаёт только создатель файла (main); окна открывают готовый
+        self.path = path
+        self.shapes = list(shapes)
+        self.colors = [tuple(c) for c in colors]
+        flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT
+        if seed is not None:
+            flags |= os.O_TRUNC
+        self._fd = os.open(path, flags, 0o644)
+        if seed is not None:
+            os.write(self._fd, HEADER.pack(MAGIC, VERSION, seed))
+
+    # при передаче в Process (spawn/forkserver) окно открывает тот же файл
+    def __reduce__(self):
+        return (SessionLog, (self.path, self.shapes, self.colors))
+
+    def publish(self, mode, round_id, figures, req_id=0, level=0):
+        (s0, c0), (s1, c1) = figures
+        self._write(PUBLISH, MODES.index(mode), level, 0, round_id, req_id, 0, 0,
+                    self.shapes.index(s0), self.colors.index(tuple(c0)),
+                    self.shapes.index(s1), self.colors.index(tuple(c1)))
+
+    def request(self, kind, req_id=0):
+        self._write(kind, 0, 0, 0, 0, req_id, 0, 0, *NO_FIGURES)
+
+    def touch(self, pos, button=1):
+        self._write(TOUCH, 0, 0, button, 0, 0, pos[0], pos[1], *NO_FIGURES)
+
+    def screen(self, size):
+        self._write(SCREEN, 0, 0, 0, 0, 0, size[0], size[1], *NO_FIGURES)
+
+    def _write(self, kind, *fields):
+        try:
+            os.write(self._fd, RECORD.pack(time.monotonic(), kind, *fields))
+        except OSError:
+            pass  # диск кончился — игра важнее лога
+
+    def close(self):
+        os.close(self._fd)
+
+
+def new_session_path(directory, keep=20):
+    # файл новой сессии в directory; старые сверх keep удаляются
+    os.makedirs(directory, exist_ok=True)
+    old = sorted(name for name in os.listdir(directory) if name.endswith(".session"))
+    for name in old[:max(0, len(old) - keep + 1)]:
+        try:
+            os.unlink(os.path.join(directory, name))
+        except OSError:
+            pass
+    return os.path.join(directory, time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}.session")
+
+
+def read_session(path, shapes, colors):
+    # (seed, [Record, ...]); недописанная последняя запись отбрасывается
+    shapes = list(shapes)
+    colors = [tuple(c) for c in colors]
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise SessionError(f"{path}: нет заголовка")
+    magic, version, seed = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise SessionError(f"{path}: не лог сессии")
+    if version != VERSION:
+        raise SessionError(f"{path}: версия {version}, ожидается {VERSION}")
+    records = []
+    end = len(data) - (len(data) - HEADER.size) % RECORD.size
+    for (t, kind, mode, level, button, round_id, req_id, x, y,
+         s0, c0, s1, c1) in RECORD.iter_unpack(data[HEADER.size:end]):
+        if kind not in KINDS:
+            raise SessionError(f"{path}: неизвестный тип записи {kind}")
+        figures = None
+        if s0 != 0xFF:
+            figures = [(shapes[s0], colors[c0]), (shapes[s1], colors[c1])]
+        records.append(Record(t, kind, MODES[mode] if kind == PUBLISH else None,
+                              level, button, round_id, req_id, (x, y), figures))
+    return seed, records
+
+
+if __name__ == "__main__":
+    # самопроверка: записи из двух процессов в один файл
+    import multiprocessing
+    import tempfile
+
+    shapes = ["circle", "hexagon", "triangle", "cross", "square"]
+    colors = [(255, 165, 0), (200, 0, 200), (0, 200, 0), (0, 128, 255), (255, 0, 0)]
+    figures = [("circle", (0, 200, 0)), ("square", (0, 128, 255))]
+
+    with tempfile.TemporaryDirectory() as directory:
+        for i in range(3):
+            open(os.path.join(directory, f"2020010{i}-000000-1.session"), "w").close()
+        path = new_session_path(directory, keep=2)
+        assert sorted(os.listdir(directory)) == ["20200102-000000-1.session"]
+
+        log = SessionLog(path, shapes, colors, seed=2 ** 40 + 7)
+        log.publish("splash", 1, figures)
+
+        def child(log):
+            log.screen((800, 480))
+            for i in range(100):
+                log.touch((400, 300 + i))
+
+        proc = multiprocessing.get_context("fork").Process(target=child, args=(log,))
+        proc.start()
+        for i in range(100):
+            log.request(REFRESH, i + 1)
+        proc.join()
+        log.publish("game", 2, figures, req_id=100, level=2)
+        log.close()
+        with open(path, "ab") as f:
+            f.write(b"\0" * 5)  # оборванная запись в конце
+
+        seed, records = read_session(path, shapes, colors)
+        assert seed == 2 ** 40 + 7
+        assert len(records) == 203
+        assert records[0] == Record(records[0].time, PUBLISH, "splash", 0, 0, 1, 0, (0, 0), figures)
+        assert records[-1][1:] == (PUBLISH, "game", 2, 0, 2, 100, (0, 0), figures)
+        touches = [r.pos[1] for r in records if r.kind == TOUCH]
+        assert touches == list(range(300, 400))
+        assert [r.req_id for r in records if r.kind == REFRESH] == list(range(1, 101))
+        print(f"session_log: ok, {RECORD.size} байт на запись")
@@ -0,0 +1,126 @@
+import os
+import threading
+import time
+from collections import deque, namedtuple
+
+# ----------------------------------------------------------
+#   СИСТЕМНЫЕ МЕТРИКИ В ФОНОВОМ ПОТОКЕ
+#   Температура, частота CPU, флаги троттлинга и load average
+#   читаются в отдельном потоке, цикл окна файлов не трогает.
+#   Файлы sysfs/procfs открываются один раз, дальше каждое чтение —
+#   os.pread с нулевого смещения (ядро заново формирует содержимое).
+#   Последний замер лежит в latest: поток заменяет кортеж целиком,
+#   читателю не нужны блокировки. История — кольцевой буфер.
+#   root — корень дерева (для проверки на поддельном sysfs).
+# ----------------------------------------------------------
+THERMAL_FILE = "sys/class/thermal/thermal_zone0/temp"
+FREQ_FILE = "sys/devices/system/cpu/cpu0/cpufreq/scaling_cur_freq"
+# флаги питания/перегрева прошивки Raspberry Pi (как vcgencmd get_throttled)
+THROTTLED_FILE = "sys/devices/platform/soc/soc:firmware/get_throttled"
+LOADAVG_FILE = "proc/loadavg"
+
+# None в поле — этот файл на устройстве не читается
+SystemSample = namedtuple("SystemSample", "time celsius freq_mhz throttled load1")
+
+
+class SystemSampler:
+    def __init__(self, root="/", interval=1.0, history=300):
+        self.interval = interval
+        self._fds = {}
+        for key, name in (("thermal", THERMAL_FILE), ("freq", FREQ_FILE),
+                          ("throttled", THROTTLED_FILE), ("loadavg", LOADAVG_FILE)):
+            try:
+                self._fds[key] = os.open(os.path.join(root, name), os.O_RDONLY)
+            except OSError:
+                pass
+        self._history = deque(maxlen=history)
+        self._stop = threading.Event()
+        self._thread = None
+        self.latest = self.sample()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds = {}
+
+    def history(self):
+        # копия буфера, старые замеры первыми
+        return list(self._history)
+
+    def sample(self):
+        millis = self._read("thermal", int)
+        khz = self._read("freq", int)
+        load = self._read("loadavg", lambda text: float(text.split()[0]))
+        sample = SystemSample(
+            time.monotonic(),
+            None if millis is None else millis / 1000,
+            None if khz is None else khz // 1000,
+            self._read("throttled", lambda text: int(text, 16)),
+            load,
+        )
+        self._history.append(sample)
+        return sample
+
+    def _read(self, key, parse):
+        fd = self._fds.get(key)
+        if fd is None:
+            return None
+        try:
+            return parse(os.pread(fd, 64, 0).decode().strip())
+        except (OSError, ValueError, IndexError):
+            return None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.latest = self.sample()
+
+
+if __name__ == "__main__":
+    # самопроверка на поддельном дереве sysfs/procfs
+    import tempfile
+
+    def write(root, name, text):
+        path = os.path.join(root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    with tempfile.TemporaryDirectory() as root:
+        write(root, THERMAL_FILE, "48312\n")
+        write(root, FREQ_FILE, "1500000\n")
+        write(root, THROTTLED_FILE, "50005\n")
+        write(root, LOADAVG_FILE, "0.52 0.40 0.31 1/123 4567\n")
+
+        sampler = SystemSampler(root, interval=0.01, history=5)
+        first = sampler.latest
+        assert (first.celsius, first.freq_mhz, first.throttled, first.load1) == \
+            (48.312, 1500, 0x50005, 0.52), first
+
+        # файлы меняются — поток подхватывает новые значения по тем же fd
+        sampler.start()
+        write(root, THERMAL_FILE, "81000\n")
+        write(root, FREQ_FILE, "600000\n")
+        deadline = time.monotonic() + 2
+        while sampler.latest.celsius != 81.0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.1)
+        sampler.stop()
+        latest = sampler.latest
+        assert (latest.celsius, latest.freq_mhz) == (81.0, 600), latest
+        history = sampler.history()
+        assert len(history) == 5 and history[-1] == latest
+        assert all(a.time <= b.time for a, b in zip(history, history[1:]))
+
+    # дерево без файлов (не Raspberry Pi) — все поля None, без исключений
+    with tempfile.TemporaryDirectory() as root:
+        empty = SystemSampler(root).latest
+        assert empty[1:] == (None, None, None, None), empty
+    print("sysmetrics: ok")
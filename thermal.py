@@ -0,0 +1,78 @@
+from collections import namedtuple
+
+# ----------------------------------------------------------
+#   ТЕРМО-РЕГУЛЯТОР КАЧЕСТВА
+#   По температуре CPU выбирается уровень: чем горячее, тем ниже
+#   fps окон и вместо smoothscale — быстрое масштабирование.
+#   Уровень выбирает main (регулятор один на всю игру), окна
+#   получают его номер через общее состояние раунда.
+#   Обратно на уровень ниже — только когда остыли на hysteresis
+#   градусов ниже порога, иначе у порога уровень бы дребезжал.
+#   Вниз уровни проходятся по одному, у каждого — свой порог
+#   минус hysteresis: с hot при 68°C остаётся warm (порог 70).
+# ----------------------------------------------------------
+
+# name, порог °C (от него и выше), fps окон, smoothscale или быстрое
+ThermalLevel = namedtuple("ThermalLevel", "name above fps smooth")
+
+
+class ThermalGovernor:
+    def __init__(self, levels, hysteresis=5.0):
+        # levels — по возрастанию порога, первый — обычный режим
+        self.levels = list(levels)
+        self.hysteresis = hysteresis
+        self.index = 0
+
+    @property
+    def level(self):
+        return self.levels[self.index]
+
+    def update(self, celsius):
+        # True — уровень поменялся
+        target = 0
+        for i, level in enumerate(self.levels):
+            if celsius >= level.above:
+                target = i
+        if target < self.index:
+            # остываем: ниже уровня — только если остыли под его порог
+            target = self.index
+            while target > 0 and celsius <= self.levels[target].above - self.hysteresis:
+                target -= 1
+        changed = target != self.index
+        self.index = target
+        return changed
+
+
+if __name__ == "__main__":
+    # самопроверка: регулятор на поддельном файле датчика
+    import os
+    import tempfile
+
+    from sysmetrics import THERMAL_FILE, SystemSampler
+
+    levels = [ThermalLevel("normal", 0, 60, True),
+              ThermalLevel("warm", 70, 30, False),
+              ThermalLevel("hot", 80, 15, False)]
+    governor = ThermalGovernor(levels, hysteresis=5)
+
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, THERMAL_FILE)
+        os.makedirs(os.path.dirname(path))
+        with open(path, "w") as f:
+            f.write("garbage")
+        sampler = SystemSampler(root)
+        assert sampler.latest.celsius is None
+
+        # (милли°C в файле, ожидаемый уровень)
+        steps = [(45000, "normal"), (69900, "normal"), (70000, "warm"),
+                 (83500, "hot"), (76000, "hot"), (74000, "warm"),
+                 (66000, "warm"), (64900, "normal"), (90000, "hot"),
+                 (50000, "normal"), (83000, "hot"), (68000, "warm"),
+                 (65500, "warm"), (64000, "normal")]
+        for millis, expected in steps:
+            with open(path, "w") as f:
+                f.write(f"{millis}\n")
+            governor.update(sampler.sample().celsius)
+            assert governor.level.name == expected, (millis, governor.level.name, expected)
+        sampler.stop()
+    print("thermal: ok")
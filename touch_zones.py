@@ -0,0 +1,131 @@
+from collections import namedtuple
+
+import pygame
+
+# ----------------------------------------------------------
+#   ЗОНЫ КАСАНИЯ (равномерная сетка)
+#   Экран делится на клетки cell x cell. Каждая зона записана во
+#   все клетки, которые задевает, список клетки отсортирован по
+#   приоритету. Тап — одна клетка и проверка её (короткого) списка
+#   сверху вниз, сколько бы зон ни было на экране.
+#   Зоны могут перекрываться: побеждает больший priority, при
+#   равном — добавленная позже (как нарисованная поверх).
+#   Регистрация перестраивает клетки зоны — она бывает редко.
+# ----------------------------------------------------------
+# command — что выполнить по тапу (вызывает владелец зон)
+Zone = namedtuple("Zone", "name rect command priority")
+
+
+class TouchZones:
+    def __init__(self, size, cell=64):
+        self.width, self.height = size
+        self.cell = cell
+        self.cols = -(-self.width // cell)
+        self.rows = -(-self.height // cell)
+        self._cells = [[] for _ in range(self.cols * self.rows)]
+        self._zones = {}   # name -> Zone
+        self._rank = {}    # name -> ключ сортировки в клетке
+        self._added = 0
+
+    def __len__(self):
+        return len(self._zones)
+
+    def __contains__(self, name):
+        return name in self._zones
+
+    def add(self, name, rect, command, priority=0):
+        # зона с тем же именем заменяется
+        if name in self._zones:
+            self.remove(name)
+        zone = Zone(name, pygame.Rect(rect), command, priority)
+        self._zones[name] = zone
+        self._added += 1
+        self._rank[name] = (-priority, -self._added)
+        for index in self._cells_of(zone.rect):
+            cell = self._cells[index]
+            cell.append(zone)
+            cell.sort(key=lambda z: self._rank[z.name])
+        return zone
+
+    def remove(self, name):
+        zone = self._zones.pop(name)
+        for index in self._cells_of(zone.rect):
+            self._cells[index].remove(zone)
+        del self._rank[name]
+
+    def get(self, name):
+        return self._zones.get(name)
+
+    def hit(self, pos):
+        # зона под точкой или None
+        x, y = pos
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        for zone in self._cells[y // self.cell * self.cols + x // self.cell]:
+            if zone.rect.collidepoint(pos):
+                return zone
+        return None
+
+    def _cells_of(self, rect):
+        rect = rect.clip((0, 0, self.width, self.height))
+        if not rect.width or not rect.height:
+            return []
+        cell = self.cell
+        return [row * self.cols + col
+                for row in range(rect.top // cell, (rect.bottom - 1) // cell + 1)
+                for col in range(rect.left // cell, (rect.right - 1) // cell + 1)]
+
+
+if __name__ == "__main__":
+    # самопроверка и сравнение с цепочкой collidepoint
+    import random
+    import time
+
+    size = (800, 480)
+    zones = TouchZones(size)
+    zones.add("refresh", (0, 160, 800, 320), "refresh")
+    zones.add("shutdown", (20, 20, 110, 40), "shutdown", priority=10)
+    zones.add("under", (0, 0, 200, 200), "under")
+    assert zones.hit((25, 25)).name == "shutdown"   # приоритет выше
+    assert zones.hit((150, 150)).name == "under"
+    assert zones.hit((400, 479)).name == "refresh"
+    assert zones.hit((400, 480)) is None and zones.hit((-1, 300)) is None
+    assert zones.hit((500, 100)) is None
+    zones.add("over", (0, 160, 100, 100), "over")    # тот же приоритет, позже — поверх
+    assert zones.hit((50, 200)).name == "over"
+    zones.remove("over")
+    assert zones.hit((50, 200)).name == "refresh"
+    zones.add("shutdown", (700, 400, 50, 50), "shutdown")  # замена по имени
+    assert zones.hit((25, 25)).name == "under" and zones.hit((710, 410)).name == "shutdown"
+    zones.add("outside", (790, 470, 100, 100), "outside")  # выходит за экран
+    assert zones.hit((799, 479)).name == "outside"
+
+    def linear_hit(ordered, pos):
+        # то, что было в dsi_window: проверки по очереди, первая совпавшая
+        for zone in ordered:
+            if zone.rect.collidepoint(pos):
+                return zone
+        return None
+
+    rnd = random.Random(1)
+    taps = [(rnd.randrange(size[0]), rnd.randrange(size[1])) for _ in range(20000)]
+    print(f"{'зон':>5s} {'сетка мкс':>10s} {'цепочка мкс':>12s}")
+    for n in (2, 10, 100, 300, 1000):
+        zones = TouchZones(size)
+        for i in range(n):
+            w, h = rnd.randrange(20, 160), rnd.randrange(20, 120)
+            zones.add(i, (rnd.randrange(size[0] - w), rnd.randrange(size[1] - h), w, h),
+                      i, priority=rnd.randrange(3))
+        ordered = sorted(zones._zones.values(), key=lambda z: zones._rank[z.name])
+        assert all(zones.hit(p) == linear_hit(ordered, p) for p in taps[:2000])
+
+        t = time.perf_counter()
+        for p in taps:
+            zones.hit(p)
+        grid_us = (time.perf_counter() - t) / len(taps) * 1e6
+        t = time.perf_counter()
+        for p in taps:
+            linear_hit(ordered, p)
+        linear_us = (time.perf_counter() - t) / len(taps) * 1e6
+        print(f"{n:5d} {grid_us:10.2f} {linear_us:12.2f}")
+    print("touch_zones: ok")